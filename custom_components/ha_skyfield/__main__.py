@@ -2,19 +2,35 @@
 import sys
 import datetime
 
+from ha_skyfield import benchmarks, server
 from ha_skyfield.bodies import Sky
 
-if len(sys.argv) > 1:
-    output = sys.argv[1]
+COMMANDS = {
+    "bench-encode": benchmarks.bench_encoding,
+    "check-precision": benchmarks.check_precision,
+    "check-conjunctions": benchmarks.check_conjunctions,
+    "check-series": benchmarks.check_series,
+    "soak": benchmarks.soak,
+    "bench-stream": benchmarks.bench_stream,
+    "serve": server.serve,
+}
+
+
+def demo(output=None):
+    seattle = (47.608, -122.335)
+    pacific = "America/Los_Angeles"
+    sky = Sky(seattle, pacific)
+    sky.load()
+    when = datetime.datetime.now()
+    sky.plot_sky(when=when, output=output)
+
+
+if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+    COMMANDS[sys.argv[1]](sys.argv[2:])
+elif len(sys.argv) > 1:
+    demo(sys.argv[1])
 else:
-    output = None
-
-seattle = (47.608, -122.335)
-pacific = "America/Los_Angeles"
-sky = Sky(seattle, pacific)
-sky.load()
-when = datetime.datetime.now()
-sky.plot_sky(when=when, output=output)
+    demo()
 
 # timelapse
 
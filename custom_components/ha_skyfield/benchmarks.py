@@ -0,0 +1,430 @@
+# custom_components/ha_skyfield/benchmarks.py
+"""Offline benchmarks, run through ``python -m ha_skyfield <command>``."""
+
+import argparse
+import asyncio
+import datetime
+import gc
+import math
+import os
+import socket
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from . import constellations, server, stars, streaming
+from .bodies import CHART_RADIUS_PX, PRECISION_FAST, PRECISION_FULL, Sky
+from .encoding import ImageEncoder
+
+SEATTLE = (47.608, -122.335)
+PACIFIC = "America/Los_Angeles"
+
+# documented error bound of the fast star tier, see Sky.compute_star_positions
+FAST_PRECISION_BOUND_ARCSEC = 30.0
+# conjunction scans must stay interactive
+CONJUNCTION_BUDGET_SECONDS = 1.0
+# half a second of grid spacing plus the refinement's own error
+CONJUNCTION_TIME_TOLERANCE = 1.0
+CONJUNCTION_SEPARATION_TOLERANCE = 0.01
+PRECISION_SITES = [(47.608, -122.335), (-33.87, 151.21), (0.0, 0.0), (69.65, 18.96)]
+
+ENCODER_CASES = [
+    ("png", {}),
+    ("png", {"png_compress_level": 1}),
+    ("png", {"png_compress_level": 9}),
+    ("png", {"png_palette_colors": 64}),
+    ("png", {"png_palette_colors": 32, "png_compress_level": 3}),
+    ("jpg", {}),
+    ("jpg", {"jpeg_quality": 70}),
+    ("jpg", {"jpeg_quality": 85, "jpeg_progressive": True}),
+    ("webp", {}),
+    ("webp", {"webp_quality": 60}),
+    ("webp", {"webp_lossless": True}),
+]
+
+
+def _demo_sky(tmpdir, **kwargs):
+    sky = Sky(SEATTLE, PACIFIC, **kwargs)
+    sky.load(tmpdir)
+    return sky
+
+
+def bench_encoding(argv=None):
+    """Compare encode time and size of every encoder case on one frame."""
+    parser = argparse.ArgumentParser(prog="ha_skyfield bench-encode")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--tmpdir", default=".")
+    args = parser.parse_args(argv)
+
+    sky = _demo_sky(args.tmpdir)
+    sky.plot_sky(_NullOutput(), when=datetime.datetime.now())
+    frame = next(iter(sky._frames.values()))
+    canvas = frame.fig.canvas
+
+    baseline = None
+    print(f"{'format':<6} {'options':<52} {'ms':>8} {'bytes':>9}")
+    for image_type, options in ENCODER_CASES:
+        encoder = ImageEncoder(image_type, **options)
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            image = encoder.encode_canvas(canvas)
+        elapsed = (time.perf_counter() - start) / args.repeat * 1000
+        print(f"{image_type:<6} {str(options):<52} {elapsed:8.1f} {len(image):9d}")
+
+    # what plot_sky used to do on every frame
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        out = _NullOutput()
+        frame.fig.savefig(out, format="png")
+        baseline = out.size
+    elapsed = (time.perf_counter() - start) / args.repeat * 1000
+    print(f"{'png':<6} {'savefig (draw + encode)':<52} {elapsed:8.1f} {baseline:9d}")
+
+
+def check_precision(argv=None):
+    """
+    Check the fast star tier against the full skyfield pipeline.
+
+    Every catalog and constellation star above the horizon is compared
+    at several sites across a year. Exits non-zero if the largest
+    deviation exceeds FAST_PRECISION_BOUND_ARCSEC.
+    """
+    parser = argparse.ArgumentParser(prog="ha_skyfield check-precision")
+    parser.add_argument("--tmpdir", default=".")
+    args = parser.parse_args(argv)
+
+    catalog = stars.load_catalog()
+    lines = constellations.load_catalog()
+    ra_hours = np.concatenate([catalog._table["ra"] / 15, lines.ra_hours])
+    dec = np.concatenate([catalog._table["dec"], lines.dec])
+
+    start = datetime.datetime.now().replace(minute=0, second=0, microsecond=0)
+    worst = 0.0
+    for latlong in PRECISION_SITES:
+        full = Sky(latlong, "UTC", precision=PRECISION_FULL)
+        fast = Sky(latlong, "UTC", precision=PRECISION_FAST)
+        full.load(args.tmpdir)
+        fast.load(args.tmpdir)
+        for days in range(0, 365, 61):
+            when = start + datetime.timedelta(days=days, hours=days % 24)
+            azi1, alt1 = full.compute_star_positions(ra_hours, dec, when)
+            azi2, alt2 = fast.compute_star_positions(ra_hours, dec, when)
+            up = alt1 <= 90
+            worst = max(worst, _max_separation_arcsec(azi1, alt1, azi2, alt2, up))
+
+    pixels = worst / 3600 * CHART_RADIUS_PX / 90 * math.pi / 2
+    print(f"max deviation {worst:.2f} arcsec (~{pixels:.3f} px on the chart)")
+    if worst > FAST_PRECISION_BOUND_ARCSEC:
+        print(f"FAIL: above the {FAST_PRECISION_BOUND_ARCSEC} arcsec bound")
+        sys.exit(1)
+
+
+def _max_separation_arcsec(azi1, alt1, azi2, alt2, mask):
+    """Largest angular distance between two sets of chart coordinates."""
+    alt1 = np.radians(90 - alt1[mask])
+    alt2 = np.radians(90 - alt2[mask])
+    cosine = np.sin(alt1) * np.sin(alt2) + np.cos(alt1) * np.cos(alt2) * np.cos(
+        azi1[mask] - azi2[mask]
+    )
+    if not cosine.size:
+        return 0.0
+    return float(np.degrees(np.arccos(np.clip(cosine, -1, 1))).max() * 3600)
+
+
+def check_conjunctions(argv=None):
+    """
+    Time a conjunction scan and check its events against dense sampling.
+
+    Each reported minimum is compared with the smallest separation on a
+    1-second grid spanning two hours, laid on whole minutes rather than
+    on the reported time, so it locates the minimum to half a second
+    independently of the scan. Exits non-zero if the scan exceeds
+    CONJUNCTION_BUDGET_SECONDS, a minimum falls outside its grid, or an
+    event is more than CONJUNCTION_TIME_TOLERANCE seconds or
+    CONJUNCTION_SEPARATION_TOLERANCE arcseconds off.
+    """
+    parser = argparse.ArgumentParser(prog="ha_skyfield check-conjunctions")
+    parser.add_argument("--days", type=int, default=120)
+    parser.add_argument("--tmpdir", default=".")
+    args = parser.parse_args(argv)
+
+    sky = _demo_sky(args.tmpdir, conjunction_days=args.days)
+    finder = sky._conjunction_finder
+    bodies = dict(finder._bodies())
+    start = datetime.datetime.now()
+    # the first scan also warms up skyfield's caches
+    finder._search(start)
+    began = time.perf_counter()
+    events = finder._search(start)
+    elapsed = time.perf_counter() - began
+    print(f"{len(events)} conjunctions in {args.days} days, scanned in {elapsed:.3f}s")
+
+    failed = elapsed > CONJUNCTION_BUDGET_SECONDS
+    offsets = np.arange(-3600, 3601)
+    for event in events:
+        reported = sky._ts.utc(sky._timezone.localize(event.when)).tt
+        tt = math.floor(reported * 1440) / 1440 + offsets / 86400
+        times = sky._ts.tt_jd(tt)
+        first = sky._location.at(times).observe(bodies[event.first]).apparent()
+        second = sky._location.at(times).observe(bodies[event.second]).apparent()
+        separation = first.separation_from(second).degrees
+        best = int(separation.argmin())
+        seconds = abs(tt[best] - reported) * 86400
+        arcsec = abs(separation[best] - event.separation) * 3600
+        print(f"  {event!r}: {seconds:.2f} s, {arcsec:.4f} arcsec off")
+        failed = (
+            failed
+            or best in (0, len(offsets) - 1)
+            or seconds > CONJUNCTION_TIME_TOLERANCE
+            or arcsec > CONJUNCTION_SEPARATION_TOLERANCE
+        )
+    if failed:
+        print("FAIL")
+        sys.exit(1)
+
+
+def check_series(argv=None):
+    """
+    Check that position queries keep an end time lying on the step grid.
+
+    Hourly and five-minute ranges across June, and ranges over both DST
+    changes, must return every sample up to and including ``end``, with
+    elapsed-time spacing across the change. Exits non-zero otherwise.
+    """
+    parser = argparse.ArgumentParser(prog="ha_skyfield check-series")
+    parser.add_argument("--tmpdir", default=".")
+    args = parser.parse_args(argv)
+
+    sky = _demo_sky(args.tmpdir, show_constellations=False)
+    hour = datetime.timedelta(hours=1)
+    cases = []
+    for day in range(1, 31):
+        date = datetime.datetime(2027, 6, day)
+        cases.append((date, date.replace(hour=4), hour, 5))
+        cases.append(
+            (
+                date.replace(hour=5),
+                date.replace(hour=22),
+                datetime.timedelta(minutes=5),
+                205,
+            )
+        )
+    # one hour is skipped in March and repeated in November
+    cases.append((datetime.datetime(2027, 3, 14), datetime.datetime(2027, 3, 14, 6), hour, 6))
+    cases.append((datetime.datetime(2027, 11, 7), datetime.datetime(2027, 11, 7, 6), hour, 8))
+
+    failed = False
+    for start, end, step, expected in cases:
+        times = sky.position_series(["Sun"], start, end, step)["times"]
+        last = datetime.datetime.fromisoformat(times[-1]).replace(tzinfo=None)
+        if len(times) != expected or last != end:
+            print(f"  {start} to {end} every {step}: {len(times)} samples ending {times[-1]}")
+            failed = True
+    print(f"{len(cases)} ranges checked")
+    if failed:
+        print("FAIL")
+        sys.exit(1)
+
+
+def soak(argv=None):
+    """
+    Render many frames offline and fail if memory keeps growing.
+
+    Time advances ``--step`` seconds per frame so bodies move and
+    figures are rebuilt, cycling through every theme. After
+    ``--warmup`` frames (ephemeris, catalogs and font caches loaded)
+    RSS and ``tracemalloc`` are sampled; the run exits non-zero if
+    either grew by more than ``--max-growth-mb`` by the end.
+    """
+    parser = argparse.ArgumentParser(prog="ha_skyfield soak")
+    parser.add_argument("--frames", type=int, default=20000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--step", type=float, default=60.0, help="seconds per frame")
+    parser.add_argument("--sample", type=int, default=1000, help="frames per report")
+    parser.add_argument("--max-growth-mb", type=float, default=16.0)
+    parser.add_argument("--themes", default="dark,light")
+    parser.add_argument("--image-type", default="png")
+    parser.add_argument("--no-tracemalloc", action="store_true")
+    parser.add_argument("--tmpdir", default=".")
+    args = parser.parse_args(argv)
+
+    themes = args.themes.split(",")
+    sky = _demo_sky(
+        args.tmpdir,
+        image_type=args.image_type,
+        presets={theme: {} for theme in themes},
+        redraw_threshold=1.0,
+        show_stars=True,
+        precision=PRECISION_FAST,
+    )
+    when = datetime.datetime.now()
+    step = datetime.timedelta(seconds=args.step)
+
+    baseline_rss = baseline_traced = None
+    start = time.perf_counter()
+    for frame in range(args.frames):
+        sky.plot_sky(_NullOutput(), when=when, theme=themes[frame % len(themes)])
+        when += step
+
+        done = frame + 1
+        if done == args.warmup:
+            gc.collect()
+            baseline_rss = _rss_mb()
+            if not args.no_tracemalloc:
+                tracemalloc.start()
+                baseline_traced = tracemalloc.take_snapshot()
+        if done > args.warmup and (done % args.sample == 0 or done == args.frames):
+            gc.collect()
+            traced = ""
+            if baseline_traced is not None:
+                traced = f" traced {tracemalloc.get_traced_memory()[0] / 2**20:7.1f} MB"
+            rate = done / (time.perf_counter() - start)
+            print(f"frame {done:6d} rss {_rss_mb():7.1f} MB{traced} ({rate:.1f} fps)", flush=True)
+
+    if baseline_rss is None:
+        print("FAIL: --frames must be larger than --warmup")
+        sys.exit(2)
+
+    gc.collect()
+    failed = False
+    rss_growth = _rss_mb() - baseline_rss
+    print(f"rss growth after warmup: {rss_growth:.1f} MB")
+    failed |= rss_growth > args.max_growth_mb
+    if baseline_traced is not None:
+        snapshot = tracemalloc.take_snapshot()
+        stats = snapshot.compare_to(baseline_traced, "lineno")
+        traced_growth = sum(stat.size_diff for stat in stats) / 2**20
+        print(f"python heap growth after warmup: {traced_growth:.1f} MB, largest:")
+        for stat in stats[:10]:
+            print(f"  {stat}")
+        tracemalloc.stop()
+        failed |= traced_growth > args.max_growth_mb
+    if failed:
+        print(f"FAIL: grew by more than {args.max_growth_mb} MB")
+        sys.exit(1)
+
+
+def bench_stream(argv=None):
+    """
+    Load test the MJPEG fan-out with many concurrent local viewers.
+
+    A render node is started on a free localhost port and ``--clients``
+    viewers open the same stream, ``--slow`` of them reading at a crawl.
+    Exits non-zero if the node rendered more than once per interval in
+    total, i.e. if the cost grew with the number of viewers.
+    """
+    parser = argparse.ArgumentParser(prog="ha_skyfield bench-stream")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--slow", type=float, default=0.1, help="share of slow viewers")
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--interval", type=int, default=2)
+    parser.add_argument("--tmpdir", default=".")
+    args = parser.parse_args(argv)
+    asyncio.run(_stream_load(args))
+
+
+async def _stream_load(args):
+    node = server.RenderNode(
+        args.tmpdir,
+        resolution=args.interval,
+        sky_options={"precision": PRECISION_FAST, "redraw_threshold": 1.0},
+    )
+
+    def handle(reader, writer):
+        # loopback buffers are megabytes deep; keep them link sized so
+        # slow viewers push back on the node instead of on the kernel
+        writer.get_extra_info("socket").setsockopt(
+            socket.SOL_SOCKET, socket.SO_SNDBUF, 65536
+        )
+        return server._handle(node, reader, writer)
+
+    listener = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    request = (
+        "GET /stream?lat=47.608&lon=-122.335&tz=America/Los_Angeles&format=jpg"
+        " HTTP/1.1\r\n\r\n"
+    ).encode()
+    marker = f"--{streaming.BOUNDARY}".encode()
+    slow_count = int(args.clients * args.slow)
+
+    async def viewer(slow):
+        sock = socket.socket()
+        if slow:
+            # a small window so the node really feels the slow reader
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8192)
+        sock.setblocking(False)
+        await asyncio.get_running_loop().sock_connect(sock, ("127.0.0.1", port))
+        reader, writer = await asyncio.open_connection(sock=sock)
+        writer.write(request)
+        frames = 0
+        tail = b""
+        try:
+            while True:
+                chunk = await reader.read(4096 if slow else 1 << 20)
+                if not chunk:
+                    break
+                frames += (tail + chunk).count(marker)
+                tail = chunk[-len(marker) :]
+                if slow:
+                    await asyncio.sleep(0.5)
+        except asyncio.CancelledError:
+            writer.close()
+            return frames
+        return frames
+
+    start = time.perf_counter()
+    tasks = [
+        asyncio.ensure_future(viewer(index < slow_count))
+        for index in range(args.clients)
+    ]
+    await asyncio.sleep(args.seconds)
+    metrics = node.metrics()
+    for task in tasks:
+        task.cancel()
+    received = await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    # let the node notice the hang-ups
+    await asyncio.sleep(0.5)
+    streams_left = node.metrics()["streams"]
+    listener.close()
+    await listener.wait_closed()
+    node.shutdown()
+
+    fast = sorted(received[slow_count:])
+    print(f"{args.clients} viewers ({slow_count} slow) for {elapsed:.1f} s")
+    print(f"streams left open after hang-up: {streams_left}")
+    print(f"renders: {metrics['completed']}, stream frames: {metrics['stream_frames']}")
+    print(f"skipped for slow viewers: {metrics['stream_frames_skipped']}")
+    if fast:
+        print(f"frames per fast viewer: min {fast[0]} median {fast[len(fast) // 2]} max {fast[-1]}")
+    if slow_count:
+        print(f"frames per slow viewer: max {max(received[:slow_count])}")
+    budget = math.ceil(elapsed / args.interval) + 1
+    if metrics["completed"] > budget:
+        print(f"FAIL: {metrics['completed']} renders, expected at most {budget}")
+        sys.exit(1)
+
+
+def _rss_mb():
+    """Current resident set size; peak RSS where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        import resource  # not on Windows
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+class _NullOutput:
+    """A write-only sink that only counts bytes."""
+
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+        return len(data)
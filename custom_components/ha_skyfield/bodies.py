@@ -1,23 +1,42 @@
 # custom_components/ha_skyfield/bodies.py
 
+import collections
 import datetime
 import math
 import os
 import yaml
 
 from pytz import timezone
-from skyfield.api import Loader, Topos
+from skyfield.api import Star, Topos
 
 import matplotlib
 matplotlib.use("agg")
 import matplotlib.pyplot as plt
 import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.transforms import Bbox
 from matplotlib.patches import Ellipse  # For Saturn's rings
 
-from . import constellations
+from . import conjunctions, constellations, ephemeris, satellites, spherical, stars, styles, trails
+from .encoding import ImageEncoder
 
 EARTH = "earth"
 SUN = "sun"
+FIGSIZE = (6, 6.2)
+# approximate horizon radius of a FIGSIZE chart before one has been drawn
+CHART_RADIUS_PX = 250
+MAX_REFRESH_SAMPLES = 120
+SIDEREAL_DEG_PER_SEC = 360 / 86164.0905
+# rendered figures kept for the redraw check, least recently used dropped
+MAX_THEME_FRAMES = 4
+# bounds of position_series: samples per body per query, and cached queries
+MAX_POSITION_SAMPLES = 10000
+MAX_POSITION_QUERIES = 32
+
+PRECISION_FULL = "full"
+PRECISION_FAST = "fast"
+PRECISIONS = (PRECISION_FULL, PRECISION_FAST)
 
 class Sky:
     def __init__(
@@ -35,61 +54,31 @@ class Sky:
         default_theme="dark",
         presets=None,
         color_preset=None,
+        redraw_threshold=0.0,
+        image_options=None,
+        observer_group=None,
+        show_stars=False,
+        star_magnitude_limit=5.5,
+        precision=PRECISION_FULL,
+        satellite_files=None,
+        satellite_list=None,
+        trail_hours=0,
+        analemma_hours=None,
+        conjunction_days=0,
+        conjunction_max_separation=conjunctions.DEFAULT_MAX_SEPARATION,
     ):
-        # built-in dark palette as fallback
-        builtin_dark = {
-            "glow": True,
-            "background_outer": "#020202",
-            "background_inner": "#1c1c1c",
-            "grid_circle": "#050505",
-            "text": "#f0f0f0",
-            "legend_face": "#2a2a2a",
-            "legend_edge": "#444444",
-            "rgrid_color": "#707070",
-            "tgrid_color": "#707070",
-            "sun_today": "#fff09a",
-            "solstice_winter": "#56b4e9",
-            "solstice_summer": "#009e73",
-            "star_size": 10,
-            "star_color": "#64CDFA",
-            "star_alpha": 0.6,
-            "constellation_color": "#64CDFA",
-            "constellation_linewidth": 0.5,
-            "constellation_alpha": 0.1,
-            "planets": {
-                "Sun": "#fff09a",
-                "Mercury": "#adbbc3",
-                "Venus": "#e5dbb6",
-                "Moon": "#999999",
-                "Mars": "#ef000f",
-                "Jupiter": "#e6b200",
-                "Saturn": "#ffb000",
-                "Uranus": "#00f9ff",
-                "Neptune": "#0079ff",
-            },
-        }
-
-        # Merge built-in dark with user presets (YAML overrides)
-        merged = {"dark": builtin_dark}
-        if presets:
-            merged.update(presets)
-        self._presets = merged
-        self._builtin_dark = builtin_dark
-
+        self._styles = styles.compile_styles(presets)
         self._default_theme = default_theme
         self._selected_theme = color_preset or default_theme
-
-        # pick the current colors dict
-        colors = self._presets.get(
-            self._selected_theme,
-            self._presets.get(self._default_theme, {})
-        )
-        colors["glow"] = bool(colors.get("glow", True))
-        self._colors = colors
+        self._style = self._resolve_style(self._selected_theme)
 
         # sky setup
         lat, lon = latlong
+        self._latitude = lat
+        self._longitude = lon
         self._latlong = Topos(latitude_degrees=lat, longitude_degrees=lon)
+        self._observer_group = observer_group
+        self._site = None
         self._timezone = timezone(tzname)
         self._planets = None
         self._ts = None
@@ -99,11 +88,35 @@ class Sky:
         self._constellations = []
         self._points = []
         self._show_constellations = show_constellations
+        self._show_stars = show_stars
+        self._star_magnitude_limit = star_magnitude_limit
+        self._star_field = None
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision {precision!r}")
+        self._precision = precision
+        self._star_rotation = None
+        self._satellite_files = satellite_files
+        self._satellite_list = satellite_list
+        self._satellite_layer = None
+        self._trail_hours = trail_hours
+        self._trail_set = None
+        self._analemma_hours = tuple(analemma_hours or ())
+        self._analemma = None
+        self._conjunction_days = conjunction_days
+        self._conjunction_max_separation = conjunction_max_separation
+        self._conjunction_finder = None
         self._show_time = show_time
         self._show_legend = show_legend
         self._north_up = north_up
         self._horizontal_flip = horizontal_flip
         self._image_type = image_type
+        self._encoder = ImageEncoder(image_type, **(image_options or {}))
+        self._redraw_threshold = redraw_threshold
+        # last rendered frame per theme, for the redraw check
+        self._frames = {}
+        self._today_path = None
+        # recent position_series results, least recently used dropped
+        self._position_queries = collections.OrderedDict()
 
         if constellation_list is None:
             self._constellation_names = constellations.DEFAULT_CONSTELLATIONS
@@ -111,15 +124,24 @@ class Sky:
             self._constellation_names = constellation_list
         self._planet_list = planet_list
 
+    def close(self):
+        """Release this sky's observer site and cached frames."""
+        if self._site is not None:
+            self._observer_group.remove_site(self._site)
+            self._site = None
+        while self._frames:
+            self._frames.popitem()[1].release()
+
     def set_theme(self, theme_name: str) -> None:
-        """Switch to a new preset at runtime."""
+        """Switch to a new preset at runtime. Nothing is recomputed."""
         self._selected_theme = theme_name
-        colors = self._presets.get(
+        self._style = self._resolve_style(theme_name)
+
+    def _resolve_style(self, theme_name):
+        return self._styles.get(
             theme_name,
-            self._presets.get(self._default_theme, {})
+            self._styles.get(self._default_theme, self._styles[styles.DEFAULT_THEME]),
         )
-        colors["glow"] = bool(colors.get("glow", True))
-        self._colors = colors
 
     def load(self, tmpdir="."):
         if self._planets is None:
@@ -127,18 +149,32 @@ class Sky:
             self._run_initial_computations()
 
     def _load_sky_data(self, tmpdir):
-        load = Loader(tmpdir)
-        self._planets = load("de421.bsp")
-        self._ts = load.timescale()
+        self._planets, self._ts = ephemeris.load_ephemeris(tmpdir)
+        if self._observer_group is not None:
+            self._observer_group.load(tmpdir)
+            self._site = self._observer_group.add_site(
+                self._latitude, self._longitude
+            )
 
     def _run_initial_computations(self):
         self._location = self._planets[EARTH] + self._latlong
-        self._compute_solstice_paths()
         self._load_points()
+        if self._trail_hours:
+            self._trail_set = trails.TrailSet(self._points, self._trail_hours)
+        if self._conjunction_days:
+            self._conjunction_finder = conjunctions.ConjunctionFinder(
+                self, self._conjunction_days, self._conjunction_max_separation
+            )
         if self._show_constellations:
             self._constellations = constellations.build_constellations(
                 self, self._constellation_names
             )
+        if self._show_stars:
+            self._star_field = stars.StarField(self, self._star_magnitude_limit)
+        if self._satellite_files:
+            self._satellite_layer = satellites.SatelliteLayer(
+                self, self._satellite_files, self._satellite_list
+            )
 
     def _load_points(self):
         self._points.clear()
@@ -155,10 +191,6 @@ class Sky:
         ]:
             if self._planet_list and name not in self._planet_list:
                 continue
-            color = self._colors.get("planets", {}).get(
-                name,
-                self._builtin_dark["planets"].get(name)
-            )
             size = {
                 "Sun": 500,
                 "Mercury": 40,
@@ -171,7 +203,7 @@ class Sky:
                 "Neptune": 30,
             }.get(name, 50)
             self._points.append(
-                Point(name, self._planets[label], color, size, self)
+                Point(name, self._planets[label], size, self, key=label)
             )
 
     def _compute_solstice_paths(self):
@@ -181,7 +213,7 @@ class Sky:
             datetime.datetime(today.year, 12, 21),
             self,
             fmt="--",
-            color=self._colors.get("solstice_winter", "#56b4e9"),
+            color_key="solstice_winter",
             linewidth=1,
             alpha=0.8,
         )
@@ -190,7 +222,7 @@ class Sky:
             datetime.datetime(today.year, 6, 21),
             self,
             fmt="--",
-            color=self._colors.get("solstice_summer", "#009e73"),
+            color_key="solstice_summer",
             linewidth=1,
             alpha=0.8,
         )
@@ -199,6 +231,14 @@ class Sky:
     def get_image_type(self):
         return self._image_type
 
+    @property
+    def encoder(self):
+        return self._encoder
+
+    @property
+    def content_type(self):
+        return self._encoder.content_type
+
     def compute_position(self, body, obs_datetime):
         obs_time = self._ts.utc(self._timezone.localize(obs_datetime))
         astrometric = self._location.at(obs_time).observe(body)
@@ -207,21 +247,377 @@ class Sky:
         azi = azi.radians
         return azi, alt
 
-    def plot_sky(self, output=None, when=None):
+    def zenith_radec(self, obs_datetime):
+        """Return the RA (hours) and Dec (degrees) of the local zenith."""
+        obs_time = self._ts.utc(self._timezone.localize(obs_datetime))
+        return (obs_time.gast + self._longitude / 15) % 24, self._latitude
+
+    def compute_star_positions(self, ra_hours, dec_degrees, obs_datetime):
+        """
+        Chart coordinates of fixed J2000 stars, vectorized over arrays.
+
+        The ``full`` tier runs skyfield's complete ``observe().apparent()``
+        pipeline. The ``fast`` tier rotates the catalog to the true
+        equator of date once per day and then applies the closed-form
+        hour angle to alt/az rotation. It skips annual aberration (up to
+        20.5"), light deflection, the day's drift in precession (under
+        0.2") and polar motion. The sum stays well below half an
+        arcminute, a small fraction of a pixel on the chart.
+        """
+        if self._precision == PRECISION_FULL:
+            star = Star(ra_hours=ra_hours, dec_degrees=dec_degrees)
+            return self.compute_position(star, obs_datetime)
+
+        obs_time = self._ts.utc(self._timezone.localize(obs_datetime))
+        rotation = self._rotation_of_date(obs_datetime.date())
+        x, y, z = rotation @ spherical.unit_vectors(
+            np.asarray(ra_hours) * 15, dec_degrees
+        ).reshape(-1, 3).T
+        dec = np.arcsin(np.clip(z, -1, 1))
+        hour_angle = np.radians((obs_time.gast + self._longitude / 15) * 15) - np.arctan2(y, x)
+        lat = math.radians(self._latitude)
+        alt = np.arcsin(
+            np.sin(lat) * np.sin(dec) + np.cos(lat) * np.cos(dec) * np.cos(hour_angle)
+        )
+        azi = np.arctan2(
+            -np.cos(dec) * np.sin(hour_angle),
+            np.sin(dec) * np.cos(lat) - np.cos(dec) * np.sin(lat) * np.cos(hour_angle),
+        ) % (2 * math.pi)
+        return azi.reshape(np.shape(dec_degrees)), (90 - np.degrees(alt)).reshape(
+            np.shape(dec_degrees)
+        )
+
+    def _rotation_of_date(self, day):
+        """ICRS to true equator and equinox of date, cached for one day."""
+        if self._star_rotation is None or self._star_rotation[0] != day:
+            noon = self._ts.utc(
+                self._timezone.localize(datetime.datetime.combine(day, datetime.time(12)))
+            )
+            self._star_rotation = (day, noon.M)
+        return self._star_rotation[1]
+
+    def compute_body_position(self, label, obs_datetime):
+        """
+        :meth:`compute_position` for an ephemeris body by its label.
+
+        With an observer group this is served from the group's batched
+        evaluation shared with every other site.
+        """
+        if self._site is not None:
+            altaz = self._observer_group.site_altaz(
+                self._site, label, self._timezone.localize(obs_datetime)
+            )
+            if altaz is not None:
+                alt, azi = altaz
+                return math.radians(azi), 90 - alt
+        # no group, or this sky has been closed
+        return self.compute_position(self._planets[label], obs_datetime)
+
+    def compute_positions(self, body, obs_datetimes):
+        """Vectorized :meth:`compute_position` over a sequence of datetimes."""
+        obs_times = self._ts.from_datetimes(
+            [self._timezone.localize(obs) for obs in obs_datetimes]
+        )
+        astrometric = self._location.at(obs_times).observe(body)
+        alt, azi, _ = astrometric.apparent().altaz()
+        alt = 90 - alt.degrees
+        azi = azi.radians
+        return azi, alt
+
+    def body_positions(self, when):
+        """Return altitude and azimuth (degrees) of every charted body."""
+        positions = {}
+        for point in self._points:
+            azi, alt = point.position(when)
+            positions[point._label] = {
+                "altitude": round(90 - float(alt), 4),
+                "azimuth": round(math.degrees(float(azi)) % 360, 4),
+            }
+        return positions
+
+    def position_series(self, bodies=None, start=None, end=None, step=None):
+        """
+        Return altitude, azimuth and distance of ``bodies`` over a time range.
+
+        ``start`` and ``end`` are naive local times (default now and a day
+        later) and ``step`` a timedelta (default 10 minutes); samples are
+        spaced in elapsed time, so a DST change does not skip or repeat
+        any. Each body is evaluated once over the whole time array.
+        Results are JSON-ready: angles in degrees, distances in au and
+        times as ISO 8601 with their UTC offset. The last
+        MAX_POSITION_QUERIES distinct queries are cached.
+        """
+        charted = {point._label: point for point in self._points}
+        if bodies is None:
+            bodies = list(charted)
+        unknown = [label for label in bodies if label not in charted]
+        if unknown:
+            raise ValueError(f"Unknown bodies {unknown}, expected some of {list(charted)}")
+        if start is None:
+            start = datetime.datetime.now().replace(microsecond=0)
+        if end is None:
+            end = start + datetime.timedelta(days=1)
+        if step is None:
+            step = datetime.timedelta(minutes=10)
+        if step <= datetime.timedelta(0) or end < start:
+            raise ValueError("step must be positive and end not before start")
+
+        key = (tuple(bodies), start, end, step)
+        if key in self._position_queries:
+            self._position_queries.move_to_end(key)
+            return self._position_queries[key]
+
+        # exact datetime arithmetic, so an end on the step grid is kept
+        first_utc = self._timezone.localize(start).astimezone(datetime.timezone.utc)
+        last_utc = self._timezone.localize(end).astimezone(datetime.timezone.utc)
+        count = (last_utc - first_utc) // step + 1
+        if count > MAX_POSITION_SAMPLES:
+            raise ValueError(
+                f"{count} samples requested, at most {MAX_POSITION_SAMPLES} per query"
+            )
+        utc_times = [first_utc + index * step for index in range(count)]
+        times = self._ts.from_datetimes(utc_times)
+
+        series = {}
+        for label in bodies:
+            alt, azi, distance = (
+                self._location.at(times).observe(charted[label]._body).apparent().altaz()
+            )
+            series[label] = {
+                "altitude": np.round(alt.degrees, 4).tolist(),
+                "azimuth": np.round(azi.degrees, 4).tolist(),
+                "distance": np.round(distance.au, 8).tolist(),
+            }
+        result = {
+            "times": [when.astimezone(self._timezone).isoformat() for when in utc_times],
+            "bodies": series,
+        }
+        self._position_queries[key] = result
+        while len(self._position_queries) > MAX_POSITION_QUERIES:
+            self._position_queries.popitem(last=False)
+        return result
+
+    def next_refresh(self, when, min_interval, max_interval, pixels):
+        """
+        Estimate the seconds until a visible body moves ``pixels`` on the chart.
+
+        Planet positions are sampled ahead of ``when`` in one batched
+        evaluation per body. Stars are not sampled: their apparent motion
+        is bounded by the sidereal rate, which is converted to pixels
+        directly. The result is clamped to ``[min_interval, max_interval]``.
+        """
+        if self._satellite_layer is not None:
+            azi, _alt, _labels = self._satellite_layer.positions(
+                self._timezone.localize(when)
+            )
+            if len(azi):
+                # a satellite crosses the chart in minutes
+                return int(min_interval)
+
+        radius = self._chart_radius()
+        count = min(MAX_REFRESH_SAMPLES, max(1, math.ceil(max_interval / min_interval)))
+        step = max(min_interval, max_interval / count)
+        offsets = step * np.arange(1, count + 1)
+        offsets[-1] = min(offsets[-1], max_interval)
+        samples = [when + datetime.timedelta(seconds=float(o)) for o in offsets]
+
+        first_change = count - 1
+        for point in self._points:
+            azi0, alt0 = point.position(when)
+            azi, alt = point.positions(samples)
+            moved = _chart_distance(azi0, alt0, azi, alt) * radius / 90
+            visible_now = alt0 <= 90
+            visible = alt <= 90
+            changed = ((visible_now | visible) & (moved >= pixels)) | (
+                visible != visible_now
+            )
+            if changed.any():
+                first_change = min(first_change, int(np.argmax(changed)))
+
+        interval = float(offsets[first_change])
+        if self._constellations or self._star_field:
+            star_rate = _star_shift(SIDEREAL_DEG_PER_SEC, radius)
+            interval = min(interval, pixels / star_rate)
+        return int(min(max(interval, min_interval), max_interval))
+
+    def _chart_radius(self):
+        """Return the pixel radius of the horizon circle on the chart."""
+        for frame in self._frames.values():
+            return _horizon_radius(frame.ax)
+        return CHART_RADIUS_PX
+
+    def plot_sky(self, output=None, when=None, theme=None):
         if when is None:
             when = datetime.datetime.now()
 
-        visible = [np.linspace(0, 2 * math.pi, 200), [90.0] * 200]
+        geometry = self._compute_geometry(when)
+        style = self._style if theme is None else self._resolve_style(theme)
 
-        fig, ax = plt.subplots(
-            1, 1, figsize=(6, 6.2), subplot_kw={"projection": "polar"}
+        if output is None:
+            fig, ax = plt.subplots(
+                1, 1, figsize=FIGSIZE, subplot_kw={"projection": "polar"}
+            )
+            self._draw_chart(fig, ax, geometry, style)
+            plt.show()
+            plt.close()
+            return
+
+        self._render(output, geometry, style)
+
+    def render_set(self, encoders, when=None, theme=None):
+        """
+        Render one frame and return it encoded by each of ``encoders``.
+
+        ``encoders`` maps names to :class:`ImageEncoder` (e.g. a PNG, a
+        JPEG and a small thumbnail). Positions are computed and the chart
+        drawn once; every output is encoded from the same canvas and
+        cached with the frame until it is redrawn or restamped.
+        """
+        if when is None:
+            when = datetime.datetime.now()
+        geometry = self._compute_geometry(when)
+        style = self._style if theme is None else self._resolve_style(theme)
+        frame = self._frame_for(geometry, style)
+        return {name: frame.rendition(name, encoder) for name, encoder in encoders.items()}
+
+    def plot_sky_themes(self, outputs, when=None):
+        """
+        Render one geometry pass in several themes.
+
+        ``outputs`` maps theme names to paths or file-like objects, e.g.
+        day and night variants of the same instant.
+        """
+        if when is None:
+            when = datetime.datetime.now()
+
+        geometry = self._compute_geometry(when)
+        for theme, output in outputs.items():
+            self._render(output, geometry, self._resolve_style(theme))
+
+    def _render(self, output, geometry, style):
+        _write_output(output, self._frame_for(geometry, style).image)
+
+    def _frame_for(self, geometry, style):
+        """Return the cached frame for ``style`` if still good, else redraw."""
+        frame = self._frames.pop(style.name, None)
+        if frame is not None and frame.matches(geometry, self._redraw_threshold):
+            self._frames[style.name] = frame
+            if frame.time_label is not None:
+                frame.restamp(str(geometry.when), self._encoder)
+            return frame
+
+        # Figures are built without pyplot so the cached one is never
+        # registered with (and kept alive by) the global figure manager.
+        fig = Figure(figsize=FIGSIZE)
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot(1, 1, 1, projection="polar")
+        time_label = self._draw_chart(fig, ax, geometry, style)
+
+        if frame is not None:
+            frame.release()
+        frame = RenderedFrame(fig, ax, time_label, geometry, self._encoder)
+        self._frames[style.name] = frame
+        while len(self._frames) > MAX_THEME_FRAMES:
+            self._frames.pop(next(iter(self._frames))).release()
+        return frame
+
+    def _compute_geometry(self, when):
+        """Compute the positions of everything that moves between frames."""
+        points = [(point,) + point.position(when) for point in self._points]
+        zenith = None
+        if self._constellations or self._star_field is not None:
+            sidereal, latitude = self.zenith_radec(when)
+            zenith = spherical.zenith_vector(sidereal, latitude)
+        constellation_segments = [
+            (constellation, constellation.segments(when, zenith))
+            for constellation in self._constellations
+        ]
+        star_positions = None
+        star_sidereal = None
+        if self._star_field is not None:
+            star_positions = self._star_field.positions(when, zenith)
+            # constellation stars are compared point by point; only the
+            # star field, left out of coords(), is bounded by the rotation
+            star_sidereal = sidereal
+        trail_geometry = None
+        if self._trail_set is not None:
+            trail_geometry = self._trail_set.update(when)
+        satellite_geometry = None
+        pass_window = None
+        if self._satellite_layer is not None:
+            aware_when = self._timezone.localize(when)
+            satellite_geometry = (
+                self._satellite_layer.positions(aware_when),
+                self._satellite_layer.pass_arcs(aware_when),
+            )
+            pass_window = self._satellite_layer.window(aware_when)
+        upcoming = None
+        if self._conjunction_finder is not None:
+            upcoming = self.conjunctions(when)[: conjunctions.MAX_LABELS]
+        # anything that changes the picture without moving a body
+        signature = (
+            datetime.date.today(),
+            self._image_type,
+            pass_window,
+            None if trail_geometry is None else trail_geometry[0],
+            None if upcoming is None else tuple(event.key for event in upcoming),
         )
+        if self._winter_solstice is None:
+            # only charts need them, not position queries
+            self._compute_solstice_paths()
+        paths = [self._winter_solstice, self._summer_solstice, self._sun_path_today()]
+        if self._analemma_hours:
+            paths.append(self._analemma_of(when.year))
+        return FrameGeometry(
+            when,
+            signature,
+            paths,
+            points,
+            constellation_segments,
+            star_positions,
+            star_sidereal,
+            satellite_geometry,
+            trail_geometry,
+            upcoming,
+        )
+
+    def conjunctions(self, when):
+        """Return the close approaches after ``when``, or [] if not enabled."""
+        if self._conjunction_finder is None:
+            return []
+        return self._conjunction_finder.events(when)
+
+    def _sun_path_today(self):
+        today = datetime.date.today()
+        if self._today_path is None or self._today_path[0] != today:
+            path = BodyPath(
+                self._planets[SUN],
+                datetime.datetime.now().replace(hour=0, minute=0),
+                self,
+                "-",
+                color_key="sun_today",
+                linewidth=1,
+                alpha=0.8,
+            )
+            self._today_path = (today, path)
+        return self._today_path[1]
+
+    def _analemma_of(self, year):
+        if self._analemma is None or self._analemma.year != year:
+            self._analemma = Analemma(
+                self._planets[SUN], year, self._analemma_hours, self
+            )
+        return self._analemma
+
+    def _draw_chart(self, fig, ax, geometry, style):
+        """Draw a full chart onto ``ax`` and return the time label, if any."""
+        visible = [np.linspace(0, 2 * math.pi, 200), [90.0] * 200]
 
         fig.patch.set_facecolor(
-            self._colors.get("background_outer", "#020202")
+            style.get("background_outer", "#020202")
         )
         ax.set_facecolor(
-            self._colors.get("background_inner", "#1c1c1c")
+            style.get("background_inner", "#1c1c1c")
         )
         ax.set_axisbelow(True)
         ax.set_theta_direction(1 if self._horizontal_flip else -1)
@@ -229,22 +625,23 @@ class Sky:
         ax.plot(
             *visible,
             "-",
-            color=self._colors.get("grid_circle", "#050505"),
+            color=style.get("grid_circle", "#050505"),
             linewidth=3,
             alpha=1.0,
         )
 
-        self._draw_objects(ax, when)
+        self._draw_objects(ax, geometry, style)
 
+        time_label = None
         if self._show_time:
-            ax.annotate(
-                str(when),
+            time_label = ax.annotate(
+                str(geometry.when),
                 xy=(0.09, 0.07),
                 xycoords="figure fraction",
                 horizontalalignment="left",
                 verticalalignment="top",
                 fontsize=8,
-                color=self._colors.get("text", "#f0f0f0"),
+                color=style.get("text", "#f0f0f0"),
             )
 
         if self._show_legend:
@@ -256,9 +653,9 @@ class Sky:
                 columnspacing=1,
                 mode=None,
                 handletextpad=0.05,
-                labelcolor=self._colors.get("text", "#f0f0f0"),
-                facecolor=self._colors.get("legend_face", "#2a2a2a"),
-                edgecolor=self._colors.get("legend_edge", "#444444"),
+                labelcolor=style.get("text", "#f0f0f0"),
+                facecolor=style.get("legend_face", "#2a2a2a"),
+                edgecolor=style.get("legend_edge", "#444444"),
             )
 
         ax.set_theta_zero_location("N" if self._north_up else "S", offset=0)
@@ -267,61 +664,230 @@ class Sky:
         ax.set_rgrids(
             np.linspace(0, 90, 10),
             [f"{int(f)}˚" for f in np.linspace(90, 0, 10)],
-            color=self._colors.get("rgrid_color", "#707070"),
+            color=style.get("rgrid_color", "#707070"),
         )
         ax.set_thetagrids(
             np.linspace(0, 360.0, 9),
             ["N","NE","E","SE","S","SW","W","NW","N"],
-            color=self._colors.get("tgrid_color", "#707070"),
+            color=style.get("tgrid_color", "#707070"),
         )
         ax.yaxis.grid(
             True,
-            color=self._colors.get("rgrid_color", "#707070"),
+            color=style.get("rgrid_color", "#707070"),
             linestyle='-'
         )
         ax.xaxis.grid(
             True,
-            color=self._colors.get("tgrid_color", "#707070"),
+            color=style.get("tgrid_color", "#707070"),
             linestyle='-'
         )
 
         fig.tight_layout()
+        return time_label
 
-        if output is None:
-            plt.show()
-        else:
-            fig.savefig(output, format=self._image_type)
-        plt.close()
+    def _draw_objects(self, ax, geometry, style):
+        for path in geometry.paths:
+            path.draw(ax, style)
 
-    def _draw_objects(self, ax, when):
-        today_sunpath = BodyPath(
-            self._planets[SUN],
-            datetime.datetime.now().replace(hour=0, minute=0),
-            self,
-            "-",
-            color=self._colors.get("sun_today", "#fff09a"),
-            linewidth=1,
-            alpha=0.8,
-        )
+        if geometry.trails is not None:
+            self._trail_set.draw(ax, geometry.trails, geometry.when, style)
 
-        for path in [self._winter_solstice, self._summer_solstice, today_sunpath]:
-            path.draw(ax)
+        for point, azi, alt in geometry.points:
+            point.draw(ax, azi, alt, style)
 
-        for point in self._points:
-            point.draw(ax, when)
+        for constellation, segments in geometry.constellations:
+            constellation.draw(ax, segments, style)
+
+        if geometry.stars is not None:
+            self._star_field.draw(ax, geometry.stars, style)
+
+        if geometry.satellites is not None:
+            self._satellite_layer.draw(ax, *geometry.satellites, style)
+
+        if geometry.conjunctions:
+            conjunctions.draw(ax, geometry.conjunctions, geometry.points, geometry.when, style)
+
+
+def _horizon_radius(ax):
+    """Return the pixel radius of the horizon circle of a chart axes."""
+    center, horizon = ax.transData.transform([(0, 0), (0, 90)])
+    return float(np.hypot(*(horizon - center)))
+
+
+def _star_shift(sidereal_degrees, radius):
+    """
+    Upper bound of how far (pixels) a star moves for a sidereal rotation.
 
-        for constellation in self._constellations:
-            constellation.draw(ax, when)
+    Equidistant polar charts stretch azimuthal motion by up to pi/2 at
+    the horizon.
+    """
+    return abs(sidereal_degrees) * radius / 90 * math.pi / 2
+
+
+def _chart_distance(azi1, alt1, azi2, alt2):
+    """Distance between chart coordinates, in degrees of zenith distance."""
+    dx = alt2 * np.sin(azi2) - alt1 * np.sin(azi1)
+    dy = alt2 * np.cos(azi2) - alt1 * np.cos(azi1)
+    return np.hypot(dx, dy)
+
+
+def _write_output(output, image):
+    """Write encoded image bytes to a path or a file-like object."""
+    if hasattr(output, "write"):
+        output.write(image)
+    else:
+        with open(output, "wb") as imagefile:
+            imagefile.write(image)
+
+
+class FrameGeometry:
+    """
+    Positions of everything on the chart, free of any styling.
+
+    One geometry can be drawn in any number of themes.
+    """
+
+    def __init__(
+        self,
+        when,
+        signature,
+        paths,
+        points,
+        constellations,
+        stars=None,
+        sidereal=None,
+        satellites=None,
+        trails=None,
+        conjunctions=None,
+    ):
+        self.when = when
+        self.signature = signature
+        self.paths = paths
+        self.points = points
+        self.constellations = constellations
+        self.stars = stars
+        # local sidereal time (hours); the star field turns rigidly with it
+        self.sidereal = sidereal
+        # ((azi, alt, labels), pass arcs)
+        self.satellites = satellites
+        # (first grid index, azi, alt) of the body trails
+        self.trails = trails
+        # the next few Conjunction events, for the chart annotations
+        self.conjunctions = conjunctions
+
+    def coords(self):
+        """
+        Return an (N, 2) array of azi/alt and a mask of entries on the chart.
+
+        Planets below the horizon are off the chart. Constellation stars
+        count whenever their segment is drawn, since the line still
+        reaches into the visible disk. The background star field is left
+        out; its motion is bounded through ``sidereal`` instead.
+        """
+        coords = [(azi, alt) for _point, azi, alt in self.points]
+        visible = [alt <= 90 for _point, _azi, alt in self.points]
+        for _constellation, segments in self.constellations:
+            for start, end in segments:
+                coords.extend((start, end))
+                visible.extend((True, True))
+        if self.satellites is not None:
+            (azi, alt, _labels), _arcs = self.satellites
+            coords.extend(zip(azi, alt))
+            visible.extend([True] * len(azi))
+        return np.array(coords, dtype=float).reshape(-1, 2), np.array(visible, dtype=bool)
+
+
+class RenderedFrame:
+    """The last encoded image and the figure that produced it."""
+
+    def __init__(self, fig, ax, time_label, geometry, encoder):
+        self.fig = fig
+        self.ax = ax
+        self.time_label = time_label
+        self.signature = geometry.signature
+        self._background = None
+        self._encoder = encoder
+        # extra encodings of the current image, by name
+        self._renditions = {}
+
+        if encoder.uses_canvas and time_label is not None:
+            # keep the pixels behind the timestamp so it can be re-stamped
+            # without redrawing the whole chart
+            strip = self._label_strip()
+            time_label.set_visible(False)
+            fig.canvas.draw()
+            self._background = fig.canvas.copy_from_bbox(strip)
+            time_label.set_visible(True)
+            fig.draw_artist(time_label)
+            self.image = encoder.encode_canvas(fig.canvas)
+        else:
+            self.image = encoder.encode_figure(fig)
+
+        coords, self._visible = geometry.coords()
+        self._pixels = ax.transData.transform(coords)
+        self._sidereal = geometry.sidereal
+
+    def _label_strip(self, pad=4):
+        """Return a full-width band of the figure around the time label."""
+        extent = self.time_label.get_window_extent(self.fig.canvas.get_renderer())
+        return Bbox.from_extents(
+            0, max(extent.y0 - pad, 0), self.fig.bbox.width, extent.y1 + pad
+        )
+
+    def matches(self, geometry, threshold):
+        """Return True if no visible body moved more than ``threshold`` pixels."""
+        if threshold <= 0 or geometry.signature != self.signature:
+            return False
+        if geometry.sidereal is not None:
+            turned = ((geometry.sidereal - self._sidereal + 12) % 24 - 12) * 15
+            if _star_shift(turned, _horizon_radius(self.ax)) > threshold:
+                return False
+        coords, visible = geometry.coords()
+        if coords.shape[0] != self._pixels.shape[0]:
+            return False
+        relevant = visible | self._visible
+        if not relevant.any():
+            return True
+        moved = self.ax.transData.transform(coords) - self._pixels
+        return bool(np.hypot(*moved[relevant].T).max() <= threshold)
+
+    def rendition(self, name, encoder):
+        """Return the current image encoded by ``encoder``, cached by name."""
+        if encoder is self._encoder:
+            return self.image
+        if name not in self._renditions:
+            if encoder.uses_canvas and self._encoder.uses_canvas:
+                # the canvas already holds the drawn image
+                self._renditions[name] = encoder.encode_canvas(self.fig.canvas)
+            else:
+                self._renditions[name] = encoder.encode_figure(self.fig)
+        return self._renditions[name]
+
+    def release(self):
+        """Drop the figure's artists now instead of waiting for the GC."""
+        self._background = None
+        self.fig.clear()
+
+    def restamp(self, text, encoder):
+        """Re-encode the cached figure with only the time label changed."""
+        self.time_label.set_text(text)
+        self._renditions = {}
+        if self._background is None:
+            self.image = encoder.encode_figure(self.fig)
+            return
+        self.fig.canvas.restore_region(self._background)
+        self.fig.draw_artist(self.time_label)
+        self.image = encoder.encode_canvas(self.fig.canvas)
 
 
 class BodyPath:
-    def __init__(self, body, day, sky, fmt, color, linewidth=1, alpha=0.8):
+    def __init__(self, body, day, sky, fmt, color_key, linewidth=1, alpha=0.8):
         self._body = body
         self._day = day
         self._sky = sky
         self.path = None
         self.fmt = fmt
-        self.color = color
+        self.color_key = color_key
         self.linewidth = linewidth
         self.alpha = alpha
 
@@ -335,33 +901,73 @@ class BodyPath:
             data.append((azi, alt))
         self.path = list(zip(*data))
 
-    def draw(self, ax):
+    def draw(self, ax, style):
         ax.plot(
             *self.path,
             self.fmt,
-            color=self.color,
+            color=style[self.color_key],
             linewidth=self.linewidth,
             alpha=self.alpha,
         )
 
+class Analemma:
+    """
+    The Sun at fixed standard clock times on every day of a year.
+
+    All days and hours are evaluated in one time array.
+    """
+
+    def __init__(self, body, year, hours, sky):
+        self.year = year
+        days = (datetime.date(year + 1, 1, 1) - datetime.date(year, 1, 1)).days
+        whens = []
+        for hour in hours:
+            for day in range(days):
+                clock = datetime.datetime(year, 1, 1, hour) + datetime.timedelta(days=day)
+                # hold standard time through daylight saving
+                whens.append(clock + sky._timezone.localize(clock).dst())
+        azi, alt = sky.compute_positions(body, whens)
+        self.paths = list(
+            zip(np.reshape(azi, (len(hours), days)), np.reshape(alt, (len(hours), days)))
+        )
+
+    def draw(self, ax, style):
+        for azi, alt in self.paths:
+            ax.plot(
+                azi,
+                alt,
+                ":",
+                color=style["analemma"],
+                linewidth=1,
+                alpha=0.7,
+            )
+
+
 class Point:
-    def __init__(self, label, body, color, size, sky):
+    def __init__(self, label, body, size, sky, key=None):
         self._label = label
         self._body = body
+        self._key = key
         self._size = size
-        self._color = color
         self._sky = sky
 
-    def draw(self, ax, when):
-        azi, alt = self._sky.compute_position(self._body, when)
+    def position(self, when):
+        if self._key is not None:
+            return self._sky.compute_body_position(self._key, when)
+        return self._sky.compute_position(self._body, when)
+
+    def positions(self, whens):
+        return self._sky.compute_positions(self._body, whens)
 
-        if self._sky._colors.get("glow", True):
+    def draw(self, ax, azi, alt, style):
+        color = style.planet_color(self._label)
+        if style["glow"]:
             ax.scatter(
                 azi,
                 alt,
                 s=self._size * 3.5,
                 alpha=0.2,
-                color=self._color,
+                color=color,
                 edgecolor="none",
                 linewidths=0,
                 zorder=1,
@@ -373,7 +979,7 @@ class Point:
             s=self._size,
             label=self._label,
             alpha=1.0,
-            color=self._color,
+            color=color,
             edgecolor="black",
             linewidths=0.5,
             zorder=2,
@@ -385,7 +991,7 @@ class Point:
                 alt,
                 s=2.0 * self._size,
                 marker="_",
-                color=self._color,
+                color=color,
                 linewidths=1.0,
                 zorder=3,
             )
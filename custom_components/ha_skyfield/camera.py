@@ -1,23 +1,49 @@
 # custom_components/ha_skyfield/camera.py
 
 from __future__ import annotations
+import asyncio
 import logging
-import io
-from datetime import timedelta
+import time
+from datetime import datetime, timedelta
 
 import voluptuous as vol
+from aiohttp import web
 import homeassistant.helpers.config_validation as cv
 from homeassistant.components.camera import Camera
 from homeassistant.helpers.config_validation import PLATFORM_SCHEMA
 from homeassistant.const import CONF_LATITUDE, CONF_LONGITUDE
 
-from .bodies import Sky
+from .bodies import PRECISION_FAST, PRECISIONS, Sky
+from .conjunctions import (
+    CONF_CONJUNCTION_DAYS,
+    CONF_CONJUNCTION_MAX_SEPARATION,
+    DEFAULT_MAX_SEPARATION,
+)
+from .encoding import ImageEncoder
+from .export import (
+    CONF_EXPORT_ARCHIVE_DIR,
+    CONF_EXPORT_PATH,
+    CONF_EXPORT_RETAIN,
+    FrameExporter,
+)
+from .observers import DATA_KEY, ObserverGroup
+from .satellites import DEFAULT_SATELLITES
+from .snapshot import SNAPSHOT_DIR, FrameSnapshot, snapshot_name
+from . import render_queue, services, streaming
+from .render_queue import PRIORITY_PRERENDER, PRIORITY_WAITING, RenderQueue
 
 _LOGGER = logging.getLogger(__name__)
 
 DOMAIN = "skyfield"
 ICON = "mdi:sun"
 
+# seconds before the next refresh at which a frame is pre-rendered
+PRERENDER_LEAD = 5
+# name of a camera's own image among its renditions
+MAIN_OUTPUT = "main"
+# the MJPEG stream's JPEG, encoded only while someone is watching
+STREAM_OUTPUT = "stream"
+
 # Configuration keys
 CONF_SHOW_CONSTELLATIONS = "show_constellations"
 CONF_SHOW_TIME = "show_time"
@@ -31,17 +57,90 @@ CONF_DEFAULT_THEME = "default_theme"
 CONF_COLOR_PRESETS = "color_presets"
 CONF_REFRESH_INTERVAL = "refresh_interval"
 CONF_COLOR_PRESET_ENTITY = "color_preset_entity"
+CONF_REDRAW_THRESHOLD = "redraw_threshold"
+CONF_ADAPTIVE_REFRESH = "adaptive_refresh"
+CONF_MIN_REFRESH_INTERVAL = "min_refresh_interval"
+CONF_MAX_REFRESH_INTERVAL = "max_refresh_interval"
+CONF_REFRESH_PIXELS = "refresh_pixels"
+CONF_IMAGE_OPTIONS = "image_options"
+CONF_SHOW_STARS = "show_stars"
+CONF_STAR_MAGNITUDE_LIMIT = "star_magnitude_limit"
+CONF_PRECISION = "precision"
+CONF_RENDER_WORKERS = "render_workers"
+CONF_SATELLITE_FILES = "satellite_files"
+CONF_SATELLITE_LIST = "satellites"
+CONF_TRAIL_HOURS = "trail_hours"
+CONF_ANALEMMA_HOURS = "analemma_hours"
+CONF_RENDITIONS = "renditions"
+CONF_MAX_SIZE = "max_size"
 
 # Schema for the presets mapping
 PRESETS_SCHEMA = vol.Schema({cv.string: dict})
 
+# Encoder settings, see encoding.DEFAULT_OPTIONS
+IMAGE_OPTIONS_SCHEMA = vol.Schema(
+    {
+        vol.Optional("png_compress_level"): vol.All(
+            vol.Coerce(int), vol.Range(min=0, max=9)
+        ),
+        vol.Optional("png_palette_colors"): vol.All(
+            vol.Coerce(int), vol.Range(min=0, max=256)
+        ),
+        vol.Optional("jpeg_quality"): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=95)
+        ),
+        vol.Optional("jpeg_progressive"): cv.boolean,
+        vol.Optional("webp_quality"): vol.All(
+            vol.Coerce(int), vol.Range(min=0, max=100)
+        ),
+        vol.Optional("webp_lossless"): cv.boolean,
+    }
+)
+
+# Extra encodings of each frame, each served by its own camera entity
+RENDITION_SCHEMA = vol.Schema(
+    {
+        vol.Optional(CONF_IMAGE_TYPE, default="png"): cv.string,
+        vol.Optional(CONF_MAX_SIZE): vol.All(vol.Coerce(int), vol.Range(min=16)),
+        vol.Optional(CONF_IMAGE_OPTIONS, default={}): IMAGE_OPTIONS_SCHEMA,
+    }
+)
+
 PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
     {
         vol.Optional(CONF_SHOW_CONSTELLATIONS, default=False): cv.boolean,
+        vol.Optional(CONF_SHOW_STARS, default=False): cv.boolean,
+        vol.Optional(CONF_STAR_MAGNITUDE_LIMIT, default=5.5): vol.All(
+            vol.Coerce(float), vol.Range(max=6.0)
+        ),
+        vol.Optional(CONF_PRECISION, default=PRECISION_FAST): vol.In(PRECISIONS),
         vol.Optional(CONF_SHOW_TIME, default=True): cv.boolean,
         vol.Optional(CONF_SHOW_LEGEND, default=True): cv.boolean,
         vol.Optional(CONF_CONSTELLATION_LIST): cv.ensure_list,
         vol.Optional(CONF_PLANET_LIST): cv.ensure_list,
+        vol.Optional(CONF_TRAIL_HOURS, default=0): vol.All(
+            vol.Coerce(float), vol.Range(min=0, max=24)
+        ),
+        vol.Optional(CONF_ANALEMMA_HOURS, default=[]): vol.All(
+            cv.ensure_list, [vol.All(vol.Coerce(int), vol.Range(min=0, max=23))]
+        ),
+        vol.Optional(CONF_CONJUNCTION_DAYS, default=0): vol.All(
+            vol.Coerce(int), vol.Range(min=0, max=366)
+        ),
+        vol.Optional(
+            CONF_CONJUNCTION_MAX_SEPARATION, default=DEFAULT_MAX_SEPARATION
+        ): vol.All(vol.Coerce(float), vol.Range(min=0, max=20)),
+        vol.Optional(CONF_EXPORT_PATH): cv.string,
+        vol.Optional(CONF_EXPORT_RETAIN, default=0): vol.All(
+            vol.Coerce(int), vol.Range(min=0)
+        ),
+        vol.Optional(CONF_EXPORT_ARCHIVE_DIR): cv.string,
+        vol.Optional(CONF_SATELLITE_FILES, default=[]): vol.All(
+            cv.ensure_list, [cv.string]
+        ),
+        vol.Optional(CONF_SATELLITE_LIST, default=DEFAULT_SATELLITES): vol.All(
+            cv.ensure_list, [cv.string]
+        ),
         vol.Optional(CONF_NORTH_UP, default=False): cv.boolean,
         vol.Optional(CONF_HORIZONTAL_FLIP, default=False): cv.boolean,
         vol.Optional(CONF_IMAGE_TYPE, default="png"): cv.string,
@@ -49,6 +148,22 @@ PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
         vol.Optional(CONF_COLOR_PRESETS, default={}): PRESETS_SCHEMA,
         vol.Optional(CONF_REFRESH_INTERVAL, default=300): cv.positive_int,
         vol.Optional(CONF_COLOR_PRESET_ENTITY): cv.entity_id,
+        vol.Optional(CONF_REDRAW_THRESHOLD, default=1.0): vol.All(
+            vol.Coerce(float), vol.Range(min=0)
+        ),
+        vol.Optional(CONF_IMAGE_OPTIONS, default={}): IMAGE_OPTIONS_SCHEMA,
+        vol.Optional(CONF_RENDITIONS, default={}): vol.Schema(
+            {cv.slug: RENDITION_SCHEMA}
+        ),
+        vol.Optional(
+            CONF_RENDER_WORKERS, default=render_queue.DEFAULT_WORKERS
+        ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+        vol.Optional(CONF_ADAPTIVE_REFRESH, default=False): cv.boolean,
+        vol.Optional(CONF_MIN_REFRESH_INTERVAL, default=30): cv.positive_int,
+        vol.Optional(CONF_MAX_REFRESH_INTERVAL, default=900): cv.positive_int,
+        vol.Optional(CONF_REFRESH_PIXELS, default=2.0): vol.All(
+            vol.Coerce(float), vol.Range(min=0, min_included=False)
+        ),
     }
 )
 
@@ -59,9 +174,27 @@ def setup_platform(hass, config, add_entities, discovery_info=None):
 
     show_const = config[CONF_SHOW_CONSTELLATIONS]
     show_time = config[CONF_SHOW_TIME]
+    show_stars = config[CONF_SHOW_STARS]
+    star_magnitude_limit = config[CONF_STAR_MAGNITUDE_LIMIT]
+    precision = config[CONF_PRECISION]
     show_legend = config[CONF_SHOW_LEGEND]
     constellations = config.get(CONF_CONSTELLATION_LIST)
     planets = config.get(CONF_PLANET_LIST)
+    # relative element files live in the HA config directory
+    satellite_files = [hass.config.path(path) for path in config[CONF_SATELLITE_FILES]]
+    satellite_list = config[CONF_SATELLITE_LIST]
+    trail_hours = config[CONF_TRAIL_HOURS]
+    analemma_hours = config[CONF_ANALEMMA_HOURS]
+    conjunction_days = config[CONF_CONJUNCTION_DAYS]
+    conjunction_max_separation = config[CONF_CONJUNCTION_MAX_SEPARATION]
+    exporter = None
+    if CONF_EXPORT_PATH in config:
+        archive_dir = config.get(CONF_EXPORT_ARCHIVE_DIR)
+        exporter = FrameExporter(
+            hass.config.path(config[CONF_EXPORT_PATH]),
+            retain=config[CONF_EXPORT_RETAIN],
+            archive_dir=hass.config.path(archive_dir) if archive_dir else None,
+        )
     north_up = config[CONF_NORTH_UP]
     horizontal_flip = config[CONF_HORIZONTAL_FLIP]
     image_type = config[CONF_IMAGE_TYPE]
@@ -69,6 +202,15 @@ def setup_platform(hass, config, add_entities, discovery_info=None):
     color_presets = config[CONF_COLOR_PRESETS]
     refresh_interval = config[CONF_REFRESH_INTERVAL]
     theme_entity = config.get(CONF_COLOR_PRESET_ENTITY)
+    redraw_threshold = config[CONF_REDRAW_THRESHOLD]
+    image_options = config[CONF_IMAGE_OPTIONS]
+    adaptive_refresh = None
+    if config[CONF_ADAPTIVE_REFRESH]:
+        adaptive_refresh = (
+            config[CONF_MIN_REFRESH_INTERVAL],
+            max(config[CONF_MIN_REFRESH_INTERVAL], config[CONF_MAX_REFRESH_INTERVAL]),
+            config[CONF_REFRESH_PIXELS],
+        )
 
     tmpdir = "/tmp/skyfield"
     _LOGGER.debug(
@@ -76,6 +218,25 @@ def setup_platform(hass, config, add_entities, discovery_info=None):
         default_theme, refresh_interval, theme_entity
     )
 
+    services.register_services(hass, tmpdir)
+
+    # every camera and sensor shares one ephemeris evaluation per instant
+    observer_group = hass.data.setdefault(DOMAIN, {}).setdefault(
+        DATA_KEY, ObserverGroup()
+    )
+    # and one bounded pool renders for all cameras; the first camera
+    # set up decides its size
+    renderer = hass.data[DOMAIN].setdefault(
+        render_queue.DATA_KEY, RenderQueue(config[CONF_RENDER_WORKERS])
+    )
+
+    # the last good frame, served at once after a restart; any change to
+    # the configuration starts a new one
+    snapshot = FrameSnapshot(
+        hass.config.path(SNAPSHOT_DIR),
+        snapshot_name(*sorted(config.items(), key=lambda item: str(item[0]))),
+    )
+
     panel = SkyFieldCam(
         latitude,
         longitude,
@@ -93,8 +254,36 @@ def setup_platform(hass, config, add_entities, discovery_info=None):
         color_presets,
         refresh_interval=refresh_interval,
         color_preset_entity=theme_entity,
+        redraw_threshold=redraw_threshold,
+        adaptive_refresh=adaptive_refresh,
+        image_options=image_options,
+        observer_group=observer_group,
+        show_stars=show_stars,
+        star_magnitude_limit=star_magnitude_limit,
+        precision=precision,
+        renderer=renderer,
+        satellite_files=satellite_files,
+        satellite_list=satellite_list,
+        trail_hours=trail_hours,
+        analemma_hours=analemma_hours,
+        conjunction_days=conjunction_days,
+        conjunction_max_separation=conjunction_max_separation,
+        exporter=exporter,
+        snapshot=snapshot,
     )
-    add_entities([panel], True)
+    renditions = [
+        SkyFieldRenditionCam(
+            panel,
+            name,
+            ImageEncoder(
+                rendition[CONF_IMAGE_TYPE],
+                max_size=rendition.get(CONF_MAX_SIZE),
+                **rendition[CONF_IMAGE_OPTIONS],
+            ),
+        )
+        for name, rendition in config[CONF_RENDITIONS].items()
+    ]
+    add_entities([panel, *renditions], True)
 
 
 class SkyFieldCam(Camera):
@@ -118,6 +307,22 @@ class SkyFieldCam(Camera):
         color_presets,
         refresh_interval: int,
         color_preset_entity: str | None = None,
+        redraw_threshold: float = 0.0,
+        adaptive_refresh: tuple[int, int, float] | None = None,
+        image_options: dict | None = None,
+        observer_group: ObserverGroup | None = None,
+        show_stars: bool = False,
+        star_magnitude_limit: float = 5.5,
+        precision: str = PRECISION_FAST,
+        renderer: RenderQueue | None = None,
+        satellite_files: list[str] | None = None,
+        satellite_list: list[str] | None = None,
+        trail_hours: float = 0,
+        analemma_hours: list[int] | None = None,
+        conjunction_days: int = 0,
+        conjunction_max_separation: float = DEFAULT_MAX_SEPARATION,
+        exporter: FrameExporter | None = None,
+        snapshot: FrameSnapshot | None = None,
     ):
         super().__init__()
         self._latitude = latitude
@@ -136,6 +341,19 @@ class SkyFieldCam(Camera):
         self._color_presets = color_presets
         self._refresh_interval = refresh_interval
         self._theme_entity = color_preset_entity
+        self._adaptive_refresh = adaptive_refresh
+        self._next_interval = refresh_interval
+        self._renderer = renderer or RenderQueue(1)
+        self._prerender_handle = None
+        self._exporter = exporter
+        self._snapshot = snapshot
+        self._encoders = {MAIN_OUTPUT: None}
+        # (monotonic time, outputs by name) of the latest render
+        self._outputs = None
+        # local time of the latest frame, and whether it is a saved one
+        # from before a restart
+        self._frame_time = None
+        self._stale = False
 
         self.sky = Sky(
             (latitude, longitude),
@@ -150,12 +368,41 @@ class SkyFieldCam(Camera):
             image_type,
             default_theme=default_theme,
             presets=color_presets,
+            redraw_threshold=redraw_threshold,
+            image_options=image_options,
+            observer_group=observer_group,
+            show_stars=show_stars,
+            star_magnitude_limit=star_magnitude_limit,
+            precision=precision,
+            satellite_files=satellite_files,
+            satellite_list=satellite_list,
+            trail_hours=trail_hours,
+            analemma_hours=analemma_hours,
+            conjunction_days=conjunction_days,
+            conjunction_max_separation=conjunction_max_separation,
+        )
+        self.content_type = self.sky.content_type
+        self._encoders[MAIN_OUTPUT] = self.sky.encoder
+        # every open stream of this camera shares one producer, which
+        # sends JPEG whatever the image_type
+        self._stream_encoder = ImageEncoder("jpg")
+        self._broadcaster = streaming.FrameBroadcaster(
+            self._async_stream_frame,
+            lambda: self.frame_interval,
+            self._stream_encoder.content_type,
         )
         self._loaded = False
 
     @property
     def frame_interval(self):
-        """Return the configured refresh interval (in seconds)."""
+        """
+        Return the refresh interval (in seconds).
+
+        With adaptive refresh this is re-estimated after every render
+        from how soon a visible body will next move on the chart.
+        """
+        if self._adaptive_refresh:
+            return self._next_interval
         return self._refresh_interval
 
     @property
@@ -166,8 +413,153 @@ class SkyFieldCam(Camera):
     def icon(self):
         return ICON
 
+    async def async_camera_image(
+        self, width: int | None = None, height: int | None = None
+    ) -> bytes | None:
+        """Return image bytes rendered on the shared render workers."""
+        stale = self._stale_output(MAIN_OUTPUT)
+        if stale is not None:
+            return stale
+        recent = self._recent_output(MAIN_OUTPUT)
+        if recent is not None:
+            self._schedule_prerender()
+            return recent
+        future = self._renderer.submit(id(self), self._render, PRIORITY_WAITING)
+        outputs = await asyncio.wrap_future(future)
+        self._schedule_prerender()
+        return outputs[MAIN_OUTPUT]
+
     def camera_image(self, width: int | None = None, height: int | None = None) -> bytes | None:
-        """Return image bytes in memory, applying live theme if configured."""
+        stale = self._stale_output(MAIN_OUTPUT)
+        if stale is not None:
+            return stale
+        recent = self._recent_output(MAIN_OUTPUT)
+        if recent is not None:
+            return recent
+        future = self._renderer.submit(id(self), self._render, PRIORITY_WAITING)
+        return future.result()[MAIN_OUTPUT]
+
+    async def _async_stream_frame(self):
+        """Return the JPEG of a recent frame, rendering one if needed."""
+        recent = self._recent_output(STREAM_OUTPUT)
+        if recent is not None:
+            self._schedule_prerender()
+            return recent
+        # a render already running when the first viewer arrived has no
+        # stream output; the one queued after it will
+        for _attempt in range(2):
+            future = self._renderer.submit(id(self), self._render, PRIORITY_WAITING)
+            outputs = await asyncio.wrap_future(future)
+            if STREAM_OUTPUT in outputs:
+                break
+        self._schedule_prerender()
+        return outputs[STREAM_OUTPUT]
+
+    def _recent_output(self, name):
+        """Return ``name`` of a frame under PRERENDER_LEAD old, e.g. a pre-render."""
+        latest = self._outputs
+        if latest is None or time.monotonic() - latest[0] >= PRERENDER_LEAD:
+            return None
+        return latest[1].get(name)
+
+    def _stale_output(self, name):
+        """
+        Return the saved frame's ``name`` while the first render runs.
+
+        The render is queued (once, however often this is called) and
+        replaces the saved frame when done.
+        """
+        latest = self._outputs
+        if not self._stale or latest is None or name not in latest[1]:
+            return None
+        self._renderer.submit(id(self), self._render, PRIORITY_WAITING)
+        return latest[1][name]
+
+    async def async_added_to_hass(self):
+        """Serve the last frame saved before a restart until a new one exists."""
+        if self._snapshot is None:
+            return
+        saved = await self.hass.async_add_executor_job(
+            self._snapshot.load, self._content_types()
+        )
+        if saved is None or self._outputs is not None:
+            return
+        self._frame_time, outputs = saved
+        self._outputs = (float("-inf"), outputs)
+        self._stale = True
+        _LOGGER.debug("Serving the frame saved at %s until the sky is loaded", self._frame_time)
+        # start loading the ephemeris now rather than on the first request
+        self._renderer.submit(id(self), self._render, PRIORITY_WAITING)
+
+    def _content_types(self):
+        return {name: encoder.content_type for name, encoder in self._encoders.items()}
+
+    async def handle_async_mjpeg_stream(self, request):
+        """Stream frames to one viewer from the camera's shared producer."""
+        response = web.StreamResponse(headers={"Content-Type": streaming.CONTENT_TYPE})
+        await response.prepare(request)
+        with self._broadcaster.subscribe() as subscription:
+            await streaming.pump(subscription, response.write)
+        return response
+
+    @property
+    def extra_state_attributes(self):
+        metrics = self._renderer.metrics()
+        return {
+            "render_queue_depth": metrics["queue_depth"],
+            "render_wait_ms": metrics["wait_ms"]["mean"],
+            "render_time_ms": metrics["render_ms"]["mean"],
+            "stream_viewers": self._broadcaster.viewers,
+            "frame_time": self._frame_time and self._frame_time.isoformat(timespec="seconds"),
+            "stale": self._stale,
+        }
+
+    def add_rendition(self, name, encoder):
+        """Also encode every frame with ``encoder``, see ``async_output``."""
+        self._encoders[name] = encoder
+
+    async def async_output(self, name):
+        """
+        Return rendition ``name`` of the latest frame.
+
+        A frame younger than the refresh interval is reused; otherwise
+        one render (shared with any concurrent request) produces every
+        rendition at once.
+        """
+        stale = self._stale_output(name)
+        if stale is not None:
+            return stale
+        latest = self._outputs
+        if latest is None or time.monotonic() - latest[0] >= self.frame_interval:
+            future = self._renderer.submit(id(self), self._render, PRIORITY_WAITING)
+            return (await asyncio.wrap_future(future))[name]
+        return latest[1][name]
+
+    def _schedule_prerender(self):
+        """
+        Queue a low priority render shortly before the next refresh.
+
+        Cameras sharing a refresh interval then spread their drawing
+        over the queue instead of all drawing at the boundary, and the
+        request at the boundary usually only restamps the time.
+        """
+        if self._prerender_handle is not None:
+            self._prerender_handle.cancel()
+        self._prerender_handle = self.hass.loop.call_later(
+            max(0, self.frame_interval - PRERENDER_LEAD), self._prerender
+        )
+
+    def _prerender(self):
+        self._prerender_handle = None
+        self._renderer.submit(id(self), self._render, PRIORITY_PRERENDER)
+
+    async def async_will_remove_from_hass(self):
+        if self._prerender_handle is not None:
+            self._prerender_handle.cancel()
+            self._prerender_handle = None
+
+    def _render(self) -> dict[str, bytes]:
+        """Return every rendition of a new frame, applying live theme if configured."""
         if self._theme_entity:
             state = self.hass.states.get(self._theme_entity)
             if state and state.state:
@@ -179,7 +571,57 @@ class SkyFieldCam(Camera):
             self._loaded = True
 
         _LOGGER.debug("Rendering skyfield plot")
-        buf = io.BytesIO()
-        self.sky.plot_sky(buf)
-        buf.seek(0)
-        return buf.getvalue()
+        when = datetime.now()
+        encoders = dict(self._encoders)
+        if self._broadcaster.viewers:
+            # one more encode of the same canvas
+            encoders[STREAM_OUTPUT] = self._stream_encoder
+        outputs = self.sky.render_set(encoders, when=when)
+        self._outputs = (time.monotonic(), outputs)
+        self._frame_time = when
+        self._stale = False
+        # on a render worker, so the disk writes never block the loop
+        if self._exporter is not None:
+            self._exporter.write(outputs[MAIN_OUTPUT], when)
+        if self._snapshot is not None:
+            self._snapshot.save(
+                when,
+                {name: outputs[name] for name in self._encoders},
+                self._content_types(),
+            )
+
+        if self._adaptive_refresh:
+            min_interval, max_interval, pixels = self._adaptive_refresh
+            self._next_interval = self.sky.next_refresh(
+                when, min_interval, max_interval, pixels
+            )
+            _LOGGER.debug("Next refresh in %ss", self._next_interval)
+        return outputs
+
+
+class SkyFieldRenditionCam(Camera):
+    """Another encoding of a SkyFieldCam's frames, e.g. a JPEG or thumbnail."""
+
+    def __init__(self, source: SkyFieldCam, rendition: str, encoder: ImageEncoder):
+        super().__init__()
+        self._source = source
+        self._rendition = rendition
+        self.content_type = encoder.content_type
+        source.add_rendition(rendition, encoder)
+
+    @property
+    def frame_interval(self):
+        return self._source.frame_interval
+
+    @property
+    def name(self):
+        return f"SkyField {self._rendition}"
+
+    @property
+    def icon(self):
+        return ICON
+
+    async def async_camera_image(
+        self, width: int | None = None, height: int | None = None
+    ) -> bytes | None:
+        return await self._source.async_output(self._rendition)
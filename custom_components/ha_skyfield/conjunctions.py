@@ -0,0 +1,230 @@
+# custom_components/ha_skyfield/conjunctions.py
+"""Upcoming close approaches between charted bodies."""
+
+import datetime
+import itertools
+import logging
+import math
+
+import numpy as np
+
+_LOGGER = logging.getLogger(__name__)
+
+CONF_CONJUNCTION_DAYS = "conjunction_days"
+CONF_CONJUNCTION_MAX_SEPARATION = "conjunction_max_separation"
+
+DEFAULT_DAYS = 30
+DEFAULT_MAX_SEPARATION = 5.0
+# the Moon moves about 3 degrees in this time, which still brackets every minimum
+COARSE_STEP = datetime.timedelta(hours=6)
+# samples per bracket in each refinement round
+REFINE_SAMPLES = 25
+REFINE_ROUNDS = 2
+# a slow pair wobbles through several minima a day apart; report the deepest
+MERGE_TIME = datetime.timedelta(days=3)
+# results are recomputed once the window has slid this far
+CACHE_TIME = datetime.timedelta(hours=6)
+EXCLUDED = ("Sun",)
+# events listed on the chart
+MAX_LABELS = 3
+# pairs this close to their conjunction are joined on the chart
+LINK_TIME = datetime.timedelta(days=1)
+
+
+class Conjunction:
+    """Closest approach of two bodies as seen from the site."""
+
+    def __init__(self, first, second, when, separation):
+        self.first = first
+        self.second = second
+        # naive local time, like every other time on a Sky
+        self.when = when
+        self.separation = separation
+
+    @property
+    def key(self):
+        return (self.first, self.second, self.when)
+
+    @property
+    def name(self):
+        return f"{self.first}–{self.second}"
+
+    def as_dict(self):
+        return {
+            "bodies": [self.first, self.second],
+            "time": self.when.isoformat(timespec="minutes"),
+            "separation": round(self.separation, 2),
+        }
+
+    def __repr__(self):
+        return f"<Conjunction {self.name} {self.when:%Y-%m-%d %H:%M} {self.separation:.2f}°>"
+
+
+class ConjunctionFinder:
+    """
+    Find every pair of bodies passing within ``max_separation`` degrees.
+
+    All bodies are evaluated once over a coarse time grid spanning
+    ``days``, each as one time array, and the separations of every pair
+    follow from a single batch of dot products. Local minima below the
+    limit are then refined together: each round samples all brackets in
+    one batched evaluation and narrows each to its best sample and
+    neighbours, finishing with a parabola through the last three. The
+    result is cached for CACHE_TIME.
+    """
+
+    def __init__(
+        self,
+        sky,
+        days=DEFAULT_DAYS,
+        max_separation=DEFAULT_MAX_SEPARATION,
+        excluded=EXCLUDED,
+    ):
+        self._sky = sky
+        self._days = days
+        self._max_separation = max_separation
+        self._excluded = set(excluded)
+        self._cache = None
+
+    def _bodies(self):
+        return [
+            (point._label, point._body)
+            for point in self._sky._points
+            if point._label not in self._excluded
+        ]
+
+    def events(self, when):
+        """Return the conjunctions after ``when`` (naive local), soonest first."""
+        if self._cache is None or not (
+            self._cache[0] <= when < self._cache[0] + CACHE_TIME
+        ):
+            self._cache = (when, self._search(when))
+        return [event for event in self._cache[1] if event.when >= when]
+
+    def _directions(self, bodies, tt):
+        """Unit vectors (bodies, 3, times) of apparent topocentric positions."""
+        times = self._sky._ts.tt_jd(tt)
+        vectors = []
+        for _label, body in bodies:
+            position = self._sky._location.at(times).observe(body).apparent().position.au
+            vectors.append(position / np.linalg.norm(position, axis=0))
+        return np.array(vectors)
+
+    def _search(self, when):
+        bodies = self._bodies()
+        if len(bodies) < 2:
+            return []
+        pairs = np.array(list(itertools.combinations(range(len(bodies)), 2)))
+        start = self._sky._ts.utc(self._sky._timezone.localize(when)).tt
+        step = COARSE_STEP / datetime.timedelta(days=1)
+        # start a step early so a minimum just after ``when`` is still interior
+        tt = start + np.arange(-step, self._days + step, step)
+
+        directions = self._directions(bodies, tt)
+        separations = _separations(directions[pairs[:, 0]], directions[pairs[:, 1]])
+
+        # interior local minima under the limit, plus a margin since the
+        # true minimum can dip below the coarse one
+        middle = separations[:, 1:-1]
+        minimum = (
+            (middle <= separations[:, :-2])
+            & (middle < separations[:, 2:])
+            & (middle < self._max_separation + 2)
+        )
+        pair_index, sample = np.nonzero(minimum)
+        if not len(pair_index):
+            return []
+
+        centers = tt[sample + 1]
+        half_width = np.full(len(centers), step)
+        offsets = np.linspace(-1, 1, REFINE_SAMPLES)
+        for _round in range(REFINE_ROUNDS):
+            grid = centers[:, None] + half_width[:, None] * offsets
+            directions = self._directions(bodies, grid.ravel()).reshape(
+                len(bodies), 3, len(centers), REFINE_SAMPLES
+            )
+            first = directions[pairs[pair_index, 0], :, np.arange(len(centers))]
+            second = directions[pairs[pair_index, 1], :, np.arange(len(centers))]
+            local = _separations(first, second)
+            best = np.clip(np.argmin(local, axis=1), 1, REFINE_SAMPLES - 2)
+            spacing = half_width * 2 / (REFINE_SAMPLES - 1)
+            rows = np.arange(len(centers))
+            left, mid, right = (local[rows, best + side] for side in (-1, 0, 1))
+            # vertex of the parabola through the best sample and its neighbours
+            curvature = left - 2 * mid + right
+            shift = np.divide(
+                0.5 * (left - right),
+                curvature,
+                out=np.zeros_like(curvature),
+                where=curvature > 0,
+            )
+            centers = grid[rows, best] + shift * spacing
+            separation = mid - 0.25 * (left - right) * shift
+            half_width = spacing
+
+        merge = MERGE_TIME / datetime.timedelta(days=1)
+        events = []
+        for row in np.argsort(separation):
+            pair, center, degrees = pair_index[row], centers[row], separation[row]
+            if degrees > self._max_separation:
+                break
+            if any(
+                pair_index[kept] == pair and abs(centers[kept] - center) < merge
+                for kept in events
+            ):
+                continue
+            events.append(row)
+        events = [
+            Conjunction(
+                *(bodies[i][0] for i in pairs[pair_index[row]]),
+                self._sky._ts.tt_jd(centers[row])
+                .astimezone(self._sky._timezone)
+                .replace(tzinfo=None),
+                float(separation[row]),
+            )
+            for row in events
+        ]
+        events.sort(key=lambda event: event.when)
+        _LOGGER.debug("Found %d conjunctions in the next %s days", len(events), self._days)
+        return events
+
+
+def _separations(first, second):
+    """Angle in degrees between unit vectors along axis 1."""
+    cosine = np.einsum("pi...,pi...->p...", first, second)
+    return np.degrees(np.arccos(np.clip(cosine, -1, 1)))
+
+
+def draw(ax, events, points, when, style):
+    """List ``events`` in the chart corner and join pairs that are near now."""
+    color = style.get("conjunction_color", style.get("text", "#f0f0f0"))
+    lines = [
+        f"{event.name} {event.separation:.1f}° {event.when:%b %d %H:%M}"
+        for event in events
+    ]
+    ax.annotate(
+        "\n".join(lines),
+        xy=(0.02, 0.98),
+        xycoords="figure fraction",
+        horizontalalignment="left",
+        verticalalignment="top",
+        fontsize=7,
+        color=color,
+    )
+    visible = {point._label: (azi, alt) for point, azi, alt in points if alt <= 90}
+    for event in events:
+        if event.when - when > LINK_TIME:
+            continue
+        if event.first in visible and event.second in visible:
+            (azi1, alt1), (azi2, alt2) = visible[event.first], visible[event.second]
+            # keep the link on the short side of the azimuth wrap
+            azi2 = azi1 + (azi2 - azi1 + math.pi) % (2 * math.pi) - math.pi
+            ax.plot(
+                [azi1, azi2],
+                [alt1, alt2],
+                ":",
+                color=color,
+                linewidth=0.8,
+                alpha=0.7,
+                zorder=1.5,
+            )
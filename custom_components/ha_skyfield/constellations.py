@@ -1,17 +1,24 @@
 # custom_components/ha_skyfield/constellations.py
 
+import functools
+import hashlib
+import io
 import os
 import datetime
 import math
 import logging
 
 import numpy as np
-from skyfield.api import Star
+
+from . import spherical
+from .export import write_atomic
 
 _LOGGER = logging.getLogger(__name__)
 
 THIS_DIR = os.path.split(__file__)[0]
 DATA_FILE = os.path.join(THIS_DIR, "constellations_by_RA_Dec.dat")
+# parsed catalog, next to the data file and named by a hash of its content
+CACHE_SUFFIX = ".npz"
 
 ZODIAC = [
     "Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo",
@@ -24,62 +31,202 @@ DEFAULT_CONSTELLATIONS = ZODIAC + [
 ]
 
 
-def read_data():
+class ConstellationCatalog:
     """
-    Read constellation lines from the data file.
+    Every constellation's stick figure as arrays.
+
+    Stars shared by several segments (or constellations) appear once in
+    the star table (``ra_hours``, ``dec``). Each constellation owns a
+    run of ``members`` (star table rows) and a run of ``segments``
+    (pairs of positions within its members), plus a precomputed
+    bounding cap, so selecting one is a pair of slices and never
+    touches the text file.
     """
-    constellations = {}
-    with open(DATA_FILE) as datafile:
-        for line in datafile:
-            line = line.strip()
-            if not line or line.startswith("#"):  
-                continue
 
+    ARRAYS = (
+        "ra_hours",
+        "dec",
+        "names",
+        "members",
+        "member_starts",
+        "segments",
+        "segment_starts",
+        "cap_centers",
+        "cap_radii",
+    )
+
+    def __init__(
+        self,
+        ra_hours,
+        dec,
+        names,
+        members,
+        member_starts,
+        segments,
+        segment_starts,
+        cap_centers,
+        cap_radii,
+    ):
+        self.ra_hours = ra_hours
+        self.dec = dec
+        self.names = names
+        self.members = members
+        self.member_starts = member_starts
+        self.segments = segments
+        self.segment_starts = segment_starts
+        self.cap_centers = cap_centers
+        self.cap_radii = cap_radii
+        self.index = {str(name): row for row, name in enumerate(names)}
+
+    @classmethod
+    def parse(cls, text):
+        """Build the catalog from the text of the data file."""
+        lines = {}
+        for line in text.splitlines():
             parts = line.split()
-            if len(parts) != 5:
+            if len(parts) != 5 or parts[0].startswith("#"):
                 continue
-            name, ra1, dec1, ra2, dec2 = parts
-            const_data = constellations.setdefault(name, [])
-            const_data.append(
-                (
-                    (float(ra1) / 360 * 24, float(dec1)),
-                    (float(ra2) / 360 * 24, float(dec2)),
-                )
+            lines.setdefault(parts[0], []).append(parts[1:])
+        endpoints = np.array(
+            [ends for rows in lines.values() for ends in rows], dtype=float
+        ).reshape(-1, 2)
+        stars, inverse = np.unique(endpoints, axis=0, return_inverse=True)
+        ra_hours, dec = stars[:, 0] / 360 * 24, stars[:, 1]
+
+        members, segments, caps = [], [], []
+        position = 0
+        for rows in lines.values():
+            ends = inverse[position : position + 2 * len(rows)]
+            position += len(ends)
+            own, local = np.unique(ends, return_inverse=True)
+            members.append(own)
+            segments.append(local.reshape(-1, 2))
+            caps.append(
+                spherical.bounding_cap(spherical.unit_vectors(ra_hours[own] * 15, dec[own]))
             )
+        return cls(
+            ra_hours,
+            dec,
+            np.array(list(lines)),
+            np.concatenate(members).astype(np.int32),
+            _starts(members),
+            np.concatenate(segments).astype(np.int32),
+            _starts(segments),
+            np.array([center for center, _radius in caps]),
+            np.array([radius for _center, radius in caps]),
+        )
+
+    @classmethod
+    def load(cls, path=DATA_FILE):
+        """
+        Return the catalog for ``path``, from its binary cache if current.
+
+        The cache is rewritten whenever the data file's hash changes; an
+        install directory that cannot be written to just parses each time.
+        """
+        with open(path, "rb") as datafile:
+            raw = datafile.read()
+        digest = hashlib.blake2b(raw, digest_size=8).hexdigest()
+        cache_path = f"{os.path.splitext(path)[0]}.{digest}{CACHE_SUFFIX}"
+        try:
+            with np.load(cache_path) as cached:
+                return cls(*(cached[key] for key in cls.ARRAYS))
+        except (OSError, ValueError, KeyError):
+            pass
+
+        catalog = cls.parse(raw.decode("utf-8"))
+        buffer = io.BytesIO()
+        np.savez(buffer, **{key: getattr(catalog, key) for key in cls.ARRAYS})
+        try:
+            write_atomic(cache_path, buffer.getvalue())
+        except OSError as err:
+            _LOGGER.debug("Could not cache constellation catalog: %s", err)
+        return catalog
+
+    def select(self, name):
+        """Return the RA (hours), Dec, segments and cap of ``name``."""
+        row = self.index[name]
+        members = self.members[self.member_starts[row] : self.member_starts[row + 1]]
+        segments = self.segments[self.segment_starts[row] : self.segment_starts[row + 1]]
+        cap = (self.cap_centers[row], float(self.cap_radii[row]))
+        return self.ra_hours[members], self.dec[members], segments, cap
+
+
+def _starts(runs):
+    """Offsets of consecutive ``runs`` in their concatenation, plus the end."""
+    return np.cumsum([0] + [len(run) for run in runs]).astype(np.int32)
+
+
+@functools.lru_cache(maxsize=1)
+def load_catalog():
+    """Return the bundled catalog, parsing it at most once per process."""
+    return ConstellationCatalog.load()
+
+
+def read_data():
+    """Return each constellation's segments as ((ra, dec), (ra, dec)) pairs."""
+    catalog = load_catalog()
+    constellations = {}
+    for name in catalog.index:
+        ra_hours, dec, segments, _cap = catalog.select(name)
+        constellations[name] = [
+            ((ra_hours[a], dec[a]), (ra_hours[b], dec[b])) for a, b in segments
+        ]
     return constellations
 
 
 class Constellation:
     """A single constellation representation."""
 
-    def __init__(self, name, radec_pairs, sky):
+    def __init__(self, name, ra_hours, dec, segments, cap, sky):
         self.name = name
-        self._radec_pairs = radec_pairs
         self._sky = sky
+        # each star once; segments are pairs of indices into them
+        self._ra_hours = ra_hours
+        self._dec = dec
+        self._segments = segments
+        self.cap_center, self.cap_radius = cap
+
+    def reaches_sky(self, zenith):
+        """Cheap test of the bounding cap against the local horizon."""
+        return bool(spherical.reaches_sky(self.cap_center, self.cap_radius, zenith))
+
+    def segments(self, when, zenith=None):
+        """Return the chart coordinates of each segment that reaches the sky."""
+        segments = []
+        if zenith is not None and not self.reaches_sky(zenith):
+            return segments
+        try:
+            azi, alt = self._sky.compute_star_positions(
+                self._ra_hours, self._dec, when
+            )
+            ends = np.column_stack([azi, alt])[self._segments]
 
-    def draw(self, ax, when):
+            # skip if both points are off-disk
+            on_disk = (ends[:, :, 1] <= 90).any(axis=1)
+            for (azi1, alt1), (azi2, alt2) in ends[on_disk].tolist():
+                segments.append(((azi1, alt1), (azi2, alt2)))
+
+        except Exception as e:
+            _LOGGER.error(
+                "Error computing constellation %s: %s", self.name, e, exc_info=True
+            )
+        return segments
+
+    def draw(self, ax, segments, style):
         """Draw this constellation with theme colors and sizes."""
         try:
             # Fetch theme values
-            star_col       = self._sky._colors.get("star_color", "#64CDFA")
-            star_alpha     = self._sky._colors.get("star_alpha", 0.6)
-            star_size      = self._sky._colors.get("star_size", 10)
-            const_col      = self._sky._colors.get("constellation_color", "#64CDFA")
-            const_lw       = self._sky._colors.get("constellation_linewidth", 0.5)
-            const_alpha    = self._sky._colors.get("constellation_alpha", 0.1)
+            star_col       = style.get("star_color", "#64CDFA")
+            star_alpha     = style.get("star_alpha", 0.6)
+            star_size      = style.get("star_size", 10)
+            const_col      = style.get("constellation_color", "#64CDFA")
+            const_lw       = style.get("constellation_linewidth", 0.5)
+            const_alpha    = style.get("constellation_alpha", 0.1)
 
             plotted = []  # avoid duplicate points
 
-            for (ra1, dec1), (ra2, dec2) in self._radec_pairs:
-                star1 = Star(ra_hours=ra1, dec_degrees=dec1)
-                star2 = Star(ra_hours=ra2, dec_degrees=dec2)
-                azi1, alt1 = self._sky.compute_position(star1, when)
-                azi2, alt2 = self._sky.compute_position(star2, when)
-
-                # skip if both points are off-disk
-                if alt1 > 90 and alt2 > 90:
-                    continue
-
+            for (azi1, alt1), (azi2, alt2) in segments:
                 # draw first star
                 if (azi1, alt1) not in plotted:
                     ax.scatter(
@@ -130,10 +277,13 @@ class Constellation:
 def build_constellations(sky, whitelist=None):
     """
     Build Constellation objects for the selected names.
+
+    Each one gets a bounding spherical cap so a frame can skip
+    constellations wholly below the horizon before any star work.
     """
-    data = read_data()
+    catalog = load_catalog()
     results = []
-    for name, radec_pairs in data.items():
+    for name in catalog.index:
         if whitelist is None or name in whitelist:
-            results.append(Constellation(name, radec_pairs, sky))
+            results.append(Constellation(name, *catalog.select(name), sky))
     return results
@@ -0,0 +1,107 @@
+# custom_components/ha_skyfield/encoding.py
+"""Encode rendered chart canvases into image bytes."""
+
+import io
+import logging
+
+import numpy as np
+from PIL import Image
+
+_LOGGER = logging.getLogger(__name__)
+
+# image_type -> Pillow format name
+PIL_FORMATS = {
+    "png": "PNG",
+    "jpg": "JPEG",
+    "jpeg": "JPEG",
+    "webp": "WEBP",
+}
+
+CONTENT_TYPES = {
+    "png": "image/png",
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+    "svg": "image/svg+xml",
+    "pdf": "application/pdf",
+}
+
+DEFAULT_OPTIONS = {
+    "png_compress_level": 6,
+    "png_palette_colors": 0,
+    "jpeg_quality": 85,
+    "jpeg_progressive": False,
+    "webp_quality": 80,
+    "webp_lossless": False,
+}
+
+
+class ImageEncoder:
+    """
+    Encode an Agg RGBA buffer with tuned settings for one image type.
+
+    Raster types Pillow knows are encoded straight from the canvas buffer,
+    downscaled first to fit ``max_size`` pixels if given. Anything else
+    (e.g. ``svg``) is left to ``Figure.savefig``.
+    """
+
+    def __init__(self, image_type="png", max_size=None, **options):
+        unknown = set(options) - set(DEFAULT_OPTIONS)
+        if unknown:
+            raise ValueError(f"Unknown image options: {', '.join(sorted(unknown))}")
+        self.image_type = image_type.lower()
+        self._options = dict(DEFAULT_OPTIONS, **options)
+        self._format = PIL_FORMATS.get(self.image_type)
+        self.max_size = max_size
+
+    @property
+    def content_type(self):
+        return CONTENT_TYPES.get(self.image_type, f"image/{self.image_type}")
+
+    @property
+    def uses_canvas(self):
+        """True if images are encoded from the RGBA buffer, not savefig."""
+        return self._format is not None
+
+    def encode_figure(self, fig):
+        """Draw ``fig`` if needed and return the encoded image."""
+        if not self.uses_canvas:
+            buf = io.BytesIO()
+            fig.savefig(buf, format=self.image_type)
+            return buf.getvalue()
+        fig.canvas.draw()
+        return self.encode_canvas(fig.canvas)
+
+    def encode_canvas(self, canvas):
+        """Encode an already drawn Agg canvas."""
+        return self.encode(np.asarray(canvas.buffer_rgba()))
+
+    def encode(self, rgba):
+        """Encode an (H, W, 4) uint8 array."""
+        opts = self._options
+        image = Image.fromarray(rgba, "RGBA").convert("RGB")
+        if self.max_size:
+            image.thumbnail((self.max_size, self.max_size), Image.Resampling.LANCZOS)
+        buf = io.BytesIO()
+        if self._format == "PNG":
+            if opts["png_palette_colors"]:
+                image = image.quantize(
+                    colors=opts["png_palette_colors"],
+                    method=Image.Quantize.FASTOCTREE,
+                )
+            image.save(buf, "PNG", compress_level=opts["png_compress_level"])
+        elif self._format == "JPEG":
+            image.save(
+                buf,
+                "JPEG",
+                quality=opts["jpeg_quality"],
+                progressive=opts["jpeg_progressive"],
+            )
+        else:
+            image.save(
+                buf,
+                "WEBP",
+                quality=opts["webp_quality"],
+                lossless=opts["webp_lossless"],
+            )
+        return buf.getvalue()
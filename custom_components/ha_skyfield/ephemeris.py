@@ -0,0 +1,27 @@
+# custom_components/ha_skyfield/ephemeris.py
+"""Ephemeris data shared by every Sky in the process."""
+
+import os
+import threading
+
+from skyfield.api import Loader
+
+EPHEMERIS_FILE = "de421.bsp"
+
+_LOADED = {}
+_LOCK = threading.Lock()
+
+
+def load_ephemeris(tmpdir="."):
+    """
+    Return ``(planets, timescale)`` for ``tmpdir``, loading it only once.
+
+    The kernel is memory-mapped by skyfield, so sharing one instance
+    also shares its pages between every camera and sensor.
+    """
+    key = os.path.abspath(tmpdir)
+    with _LOCK:
+        if key not in _LOADED:
+            load = Loader(tmpdir)
+            _LOADED[key] = (load(EPHEMERIS_FILE), load.timescale())
+        return _LOADED[key]
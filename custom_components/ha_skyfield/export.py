@@ -0,0 +1,107 @@
+# custom_components/ha_skyfield/export.py
+"""Write rendered frames to disk atomically, and only when they change."""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+
+_LOGGER = logging.getLogger(__name__)
+
+CONF_EXPORT_PATH = "export_path"
+CONF_EXPORT_RETAIN = "export_retain"
+CONF_EXPORT_ARCHIVE_DIR = "export_archive_dir"
+
+ARCHIVE_TIME_FORMAT = "%Y%m%d-%H%M%S"
+
+
+def _digest(data):
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def write_atomic(path, data):
+    """Write ``data`` to a temp file next to ``path`` and rename it over."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    handle, temp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(handle, "wb") as temp:
+            temp.write(data)
+            temp.flush()
+            os.fsync(temp.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class FrameExporter:
+    """
+    Publish frames at a fixed path for ``/local`` or other readers.
+
+    Readers only ever see a complete file: each frame is written to a
+    temp file in the same directory and renamed over the old one. A
+    frame whose content hash matches the last one written is skipped, so
+    an unchanged chart never touches the disk. With ``retain`` the most
+    recent changed frames are also kept as timestamped copies in
+    ``archive_dir`` and older ones are deleted.
+
+    ``write`` does blocking I/O; call it from a worker or executor
+    thread, never the event loop.
+    """
+
+    def __init__(self, path, retain=0, archive_dir=None):
+        self._path = path
+        self._retain = retain
+        stem, self._extension = os.path.splitext(os.path.basename(path))
+        self._prefix = f"{stem}-"
+        self._archive_dir = archive_dir or os.path.join(
+            os.path.dirname(path), f"{stem}_archive"
+        )
+        self._lock = threading.Lock()
+        self._digest = None
+
+    @property
+    def path(self):
+        return self._path
+
+    def write(self, image, when=None):
+        """Publish ``image``; return False if it was unchanged and skipped."""
+        digest = _digest(image)
+        with self._lock:
+            if self._digest is None:
+                # survive restarts without rewriting an identical file
+                try:
+                    with open(self._path, "rb") as existing:
+                        self._digest = _digest(existing.read())
+                except OSError:
+                    pass
+            if digest == self._digest:
+                return False
+            try:
+                write_atomic(self._path, image)
+                if self._retain and when is not None:
+                    self._archive(image, when)
+            except OSError as err:
+                _LOGGER.error("Could not export frame to %s: %s", self._path, err)
+                return False
+            self._digest = digest
+            return True
+
+    def _archive(self, image, when):
+        name = f"{self._prefix}{when.strftime(ARCHIVE_TIME_FORMAT)}{self._extension}"
+        write_atomic(os.path.join(self._archive_dir, name), image)
+        # the timestamp format sorts chronologically
+        frames = sorted(
+            entry
+            for entry in os.listdir(self._archive_dir)
+            if entry.startswith(self._prefix) and entry.endswith(self._extension)
+        )
+        for stale in frames[: max(0, len(frames) - self._retain)]:
+            os.unlink(os.path.join(self._archive_dir, stale))
@@ -0,0 +1,161 @@
+# custom_components/ha_skyfield/observers.py
+"""Alt/az of solar system bodies for many observing sites at once."""
+
+import datetime
+import threading
+
+import numpy as np
+from skyfield.api import wgs84
+from skyfield.framelib import itrs
+
+from . import ephemeris
+
+EARTH = "earth"
+DATA_KEY = "observers"
+
+# seconds; cameras refreshing within this window share one evaluation
+DEFAULT_RESOLUTION = 5.0
+
+
+class ObserverGroup:
+    """
+    Project ephemeris bodies to alt/az for every registered site.
+
+    For each instant Earth and each body are evaluated once, giving a
+    geocentric apparent vector. All sites are then handled in one
+    vectorized step: the vector is rotated into the Earth-fixed frame,
+    shifted to each site and turned into that site's local horizon.
+    Compared with a full topocentric ``observe().apparent()`` per site
+    this only drops diurnal aberration, well under an arcsecond even
+    for the Moon.
+
+    Sites are keyed by latitude and longitude and reference counted:
+    skies at the same place share one, and it is dropped once the last
+    of them calls ``remove_site``.
+    """
+
+    def __init__(self, resolution=DEFAULT_RESOLUTION):
+        self._resolution = resolution
+        self._lock = threading.Lock()
+        self._latitudes = []
+        self._longitudes = []
+        # site key -> [row in the arrays above, reference count]
+        self._sites = {}
+        self._site_xyz = None
+        self._site_enu = None
+        self._planets = None
+        self._ts = None
+        self._instant = None
+        self._frame = None
+        self._altaz = {}
+
+    def load(self, tmpdir="."):
+        if self._planets is None:
+            self._planets, self._ts = ephemeris.load_ephemeris(tmpdir)
+
+    def add_site(self, latitude, longitude):
+        """Register a use of a site and return its key, see ``site_altaz``."""
+        key = (round(float(latitude), 6), round(float(longitude), 6))
+        with self._lock:
+            if key in self._sites:
+                self._sites[key][1] += 1
+            else:
+                self._sites[key] = [len(self._latitudes), 1]
+                self._latitudes.append(key[0])
+                self._longitudes.append(key[1])
+                self._invalidate()
+        return key
+
+    def remove_site(self, key):
+        """Release one use of a site, dropping it with its last user."""
+        with self._lock:
+            entry = self._sites.get(key)
+            if entry is None:
+                return
+            entry[1] -= 1
+            if entry[1] > 0:
+                return
+            del self._sites[key]
+            self._latitudes = [latitude for latitude, _longitude in self._sites]
+            self._longitudes = [longitude for _latitude, longitude in self._sites]
+            for row, entry in enumerate(self._sites.values()):
+                entry[0] = row
+            self._invalidate()
+
+    def _invalidate(self):
+        self._site_xyz = None
+        self._instant = None
+
+    @property
+    def site_count(self):
+        return len(self._latitudes)
+
+    def altaz(self, label, when):
+        """
+        Return ``(alt, az)`` arrays in degrees, one entry per site.
+
+        ``when`` must be timezone aware. It is rounded to the group's
+        resolution so nearby requests share the same evaluation.
+        """
+        with self._lock:
+            self._select_instant(when)
+            if label not in self._altaz:
+                self._altaz[label] = self._compute(label)
+            return self._altaz[label]
+
+    def site_altaz(self, key, label, when):
+        """
+        Return ``(alt, az)`` in degrees at one site, or None if it was removed.
+
+        Looked up under the same lock as the evaluation, so rows never
+        shift between the two.
+        """
+        with self._lock:
+            entry = self._sites.get(key)
+            if entry is None:
+                return None
+            self._select_instant(when)
+            if label not in self._altaz:
+                self._altaz[label] = self._compute(label)
+            alt, azi = self._altaz[label]
+            return float(alt[entry[0]]), float(azi[entry[0]])
+
+    def _select_instant(self, when):
+        stamp = round(when.timestamp() / self._resolution) * self._resolution
+        if stamp == self._instant:
+            return
+        if self._site_xyz is None:
+            self._prepare_sites()
+        obs_time = self._ts.from_datetime(
+            datetime.datetime.fromtimestamp(stamp, tz=datetime.timezone.utc)
+        )
+        self._instant = stamp
+        self._frame = (
+            self._planets[EARTH].at(obs_time),
+            itrs.rotation_at(obs_time),
+        )
+        self._altaz = {}
+
+    def _prepare_sites(self):
+        lat = np.radians(self._latitudes)
+        lon = np.radians(self._longitudes)
+        self._site_xyz = wgs84.latlon(
+            np.array(self._latitudes), np.array(self._longitudes)
+        ).itrs_xyz.au.reshape(3, -1)
+        # rows: east, north, up unit vectors per site (3, 3, N)
+        self._site_enu = np.array(
+            [
+                [-np.sin(lon), np.cos(lon), np.zeros_like(lon)],
+                [-np.sin(lat) * np.cos(lon), -np.sin(lat) * np.sin(lon), np.cos(lat)],
+                [np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)],
+            ]
+        )
+
+    def _compute(self, label):
+        earth_at, rotation = self._frame
+        geocentric = earth_at.observe(self._planets[label]).apparent().xyz.au
+        topocentric = (rotation @ geocentric)[:, None] - self._site_xyz
+        east, north, up = np.einsum("ijn,jn->in", self._site_enu, topocentric)
+        alt = np.degrees(np.arctan2(up, np.hypot(east, north)))
+        azi = np.degrees(np.arctan2(east, north)) % 360
+        return alt, azi
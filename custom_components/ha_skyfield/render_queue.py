@@ -0,0 +1,171 @@
+# custom_components/ha_skyfield/render_queue.py
+"""Component-wide render workers shared by every camera."""
+
+import collections
+import concurrent.futures
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_KEY = "render_queue"
+
+# lower runs first
+PRIORITY_WAITING = 0
+PRIORITY_PRERENDER = 1
+
+DEFAULT_WORKERS = 2
+# latency samples kept for the metrics
+METRIC_SAMPLES = 200
+
+
+class _Job:
+    def __init__(self, key, fn, priority):
+        self.key = key
+        self.fn = fn
+        self.priority = priority
+        self.future = concurrent.futures.Future()
+        self.submitted = time.monotonic()
+
+
+class RenderQueue:
+    """
+    A bounded pool of render threads fed by a priority queue.
+
+    Frames a caller is waiting on run before pre-renders. A job whose
+    key matches one already queued or running joins it instead of
+    rendering again; a waited job joining a queued pre-render promotes
+    it. Jobs sharing a key never run at the same time, so one ``Sky``
+    is only ever drawn by one thread.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS):
+        self._workers = max(1, int(workers))
+        self._cond = threading.Condition()
+        self._heap = []
+        self._order = itertools.count()
+        self._pending = {}
+        self._running = {}
+        self._threads = []
+        self._closed = False
+        self._waits = collections.deque(maxlen=METRIC_SAMPLES)
+        self._renders = collections.deque(maxlen=METRIC_SAMPLES)
+        self._completed = 0
+        self._deduplicated = 0
+
+    def submit(self, key, fn, priority=PRIORITY_WAITING):
+        """Queue ``fn()`` under ``key`` and return a future of its result."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("render queue is shut down")
+            job = self._running.get(key) or self._pending.get(key)
+            if job is not None:
+                self._deduplicated += 1
+                if priority < job.priority and key in self._pending:
+                    # stale heap entries are skipped by the workers
+                    job.priority = priority
+                    heapq.heappush(self._heap, (priority, next(self._order), job))
+                    self._cond.notify()
+                return job.future
+
+            job = _Job(key, fn, priority)
+            self._pending[key] = job
+            heapq.heappush(self._heap, (priority, next(self._order), job))
+            if len(self._threads) < self._workers:
+                self._start_worker()
+            self._cond.notify()
+            return job.future
+
+    def _start_worker(self):
+        thread = threading.Thread(
+            target=self._work,
+            name=f"skyfield-render-{len(self._threads)}",
+            daemon=True,
+        )
+        self._threads.append(thread)
+        thread.start()
+
+    def _next_job(self):
+        with self._cond:
+            while True:
+                while self._heap:
+                    priority, _order, job = heapq.heappop(self._heap)
+                    if self._pending.get(job.key) is job and job.priority == priority:
+                        del self._pending[job.key]
+                        self._running[job.key] = job
+                        return job
+                if self._closed:
+                    return None
+                self._cond.wait()
+
+    def _work(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            started = time.monotonic()
+            result = error = None
+            run = job.future.set_running_or_notify_cancel()
+            if run:
+                try:
+                    result = job.fn()
+                except Exception as err:  # noqa: BLE001 - handed to the caller
+                    _LOGGER.exception("Render job %s failed", job.key)
+                    error = err
+            finished = time.monotonic()
+            with self._cond:
+                del self._running[job.key]
+                self._completed += 1
+                self._waits.append(started - job.submitted)
+                self._renders.append(finished - started)
+            # only once the job is gone, so a caller woken by the result
+            # and submitting again gets a new job, not this finished one
+            if run:
+                if error is not None:
+                    job.future.set_exception(error)
+                else:
+                    job.future.set_result(result)
+
+    @property
+    def depth(self):
+        """Number of jobs waiting for a worker."""
+        with self._cond:
+            return len(self._pending)
+
+    def metrics(self):
+        """Return queue depth and wait/render latency in milliseconds."""
+        with self._cond:
+            waits = sorted(self._waits)
+            renders = sorted(self._renders)
+            return {
+                "queue_depth": len(self._pending),
+                "running": len(self._running),
+                "workers": self._workers,
+                "completed": self._completed,
+                "deduplicated": self._deduplicated,
+                "wait_ms": _summary(waits),
+                "render_ms": _summary(renders),
+            }
+
+    def shutdown(self, wait=True):
+        """Stop the workers once the queue drains."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            threads = list(self._threads)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+
+def _summary(samples):
+    if not samples:
+        return {"mean": 0.0, "p95": 0.0, "max": 0.0}
+    return {
+        "mean": round(1000 * sum(samples) / len(samples), 1),
+        "p95": round(1000 * samples[int(0.95 * (len(samples) - 1))], 1),
+        "max": round(1000 * samples[-1], 1),
+    }
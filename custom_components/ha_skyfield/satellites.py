@@ -0,0 +1,286 @@
+# custom_components/ha_skyfield/satellites.py
+"""Earth satellites from local TLE/OMM files, propagated in batches."""
+
+import datetime
+import logging
+import math
+import os
+
+import numpy as np
+from matplotlib.collections import LineCollection
+from sgp4 import omm
+from sgp4.api import Satrec, SatrecArray, jday
+from skyfield.api import wgs84
+from skyfield.sgp4lib import theta_GMST1982
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_SATELLITES = ["ISS (ZARYA)"]
+# select every satellite in the files
+ALL = "all"
+
+# pass arcs are computed once per window, covering it and the next one
+PASS_WINDOW = datetime.timedelta(hours=3)
+PASS_STEP = datetime.timedelta(seconds=30)
+EARTH_RADIUS_KM = 6378.137
+# above this many visible satellites the chart gets too busy for names
+LABEL_LIMIT = 10
+
+
+def read_elements(path):
+    """
+    Return ``(name, Satrec)`` pairs from a TLE or OMM file.
+
+    ``.csv`` and ``.xml`` files are read as CCSDS OMM; anything else as
+    two- or three-line element sets.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, encoding="utf-8") as stream:
+        if extension in (".csv", ".xml"):
+            parse = omm.parse_csv if extension == ".csv" else omm.parse_xml
+            elements = []
+            for fields in parse(stream):
+                sat = Satrec()
+                omm.initialize(sat, fields)
+                elements.append((fields.get("OBJECT_NAME") or str(sat.satnum), sat))
+            return elements
+        lines = [line.rstrip() for line in stream if line.strip()]
+
+    elements = []
+    name = None
+    index = 0
+    while index < len(lines):
+        line = lines[index]
+        if (
+            line.startswith("1 ")
+            and index + 1 < len(lines)
+            and lines[index + 1].startswith("2 ")
+        ):
+            sat = Satrec.twoline2rv(line, lines[index + 1])
+            elements.append((name or str(sat.satnum), sat))
+            name = None
+            index += 2
+            continue
+        name = line[2:].strip() if line.startswith("0 ") else line.strip()
+        index += 1
+    return elements
+
+
+def select(elements, names):
+    """Keep the elements whose name or NORAD number is in ``names``."""
+    if any(str(name).lower() == ALL for name in names):
+        return elements
+    wanted = {str(name).strip().upper() for name in names}
+    return [
+        (name, sat)
+        for name, sat in elements
+        if name.upper() in wanted or str(sat.satnum) in wanted
+    ]
+
+
+class SatelliteLayer:
+    """
+    Current positions and upcoming pass arcs of many satellites.
+
+    Every satellite is propagated at once with ``SatrecArray`` over a
+    whole time array, and the TEME results are turned into the site's
+    alt/az in one vectorized step. Pass arcs (stretches above the
+    horizon while sunlit) are computed for two windows ahead and kept
+    until the next window starts.
+    """
+
+    def __init__(self, sky, paths, names=None):
+        self._sky = sky
+        self._paths = list(paths)
+        self._names = list(names or DEFAULT_SATELLITES)
+        self._mtimes = None
+        self._labels = []
+        self._array = None
+        lat = math.radians(sky._latitude)
+        lon = math.radians(sky._longitude)
+        self._site = wgs84.latlon(sky._latitude, sky._longitude).itrs_xyz.km
+        self._enu = np.array(
+            [
+                [-math.sin(lon), math.cos(lon), 0.0],
+                [
+                    -math.sin(lat) * math.cos(lon),
+                    -math.sin(lat) * math.sin(lon),
+                    math.cos(lat),
+                ],
+                [
+                    math.cos(lat) * math.cos(lon),
+                    math.cos(lat) * math.sin(lon),
+                    math.sin(lat),
+                ],
+            ]
+        )
+        self._arcs = None
+        self.load()
+
+    def load(self):
+        """(Re)read the element files if any of them changed."""
+        mtimes = []
+        for path in self._paths:
+            try:
+                mtimes.append(os.stat(path).st_mtime)
+            except OSError:
+                mtimes.append(None)
+        if mtimes == self._mtimes:
+            return
+        self._mtimes = mtimes
+
+        elements = []
+        for path in self._paths:
+            try:
+                elements.extend(read_elements(path))
+            except (OSError, ValueError) as err:
+                _LOGGER.error("Could not read satellite elements %s: %s", path, err)
+        elements = select(elements, self._names)
+        if not elements:
+            _LOGGER.warning("No satellites matching %s in %s", self._names, self._paths)
+        self._labels = [name for name, _sat in elements]
+        self._array = SatrecArray([sat for _name, sat in elements]) if elements else None
+        self._arcs = None
+
+    def __len__(self):
+        return len(self._labels)
+
+    def window(self, aware_when):
+        """Return the index of the pass window containing ``aware_when``."""
+        return int(aware_when.timestamp() // PASS_WINDOW.total_seconds())
+
+    def _altaz(self, aware_when, offsets, shadow=False):
+        """
+        Return (alt, az, sunlit) arrays of shape (satellites, times).
+
+        ``offsets`` are seconds after ``aware_when``. ``sunlit`` is only
+        computed with ``shadow``.
+        """
+        utc = aware_when.astimezone(datetime.timezone.utc)
+        jd0, fr0 = jday(
+            utc.year, utc.month, utc.day, utc.hour, utc.minute,
+            utc.second + utc.microsecond / 1e6,
+        )
+        fr = fr0 + offsets / 86400.0
+        jd = np.full_like(fr, jd0)
+        errors, teme, _velocity = self._array.sgp4(jd, fr)
+
+        times = self._sky._ts.utc(
+            utc.year, utc.month, utc.day, utc.hour, utc.minute,
+            utc.second + utc.microsecond / 1e6 + offsets,
+        )
+        theta, _theta_dot = theta_GMST1982(times.whole, times.ut1_fraction)
+        cos, sin = np.cos(theta), np.sin(theta)
+        x, y, z = np.moveaxis(teme, -1, 0)
+        ecef = np.stack([cos * x + sin * y, -sin * x + cos * y, z], axis=-1)
+        east, north, up = np.moveaxis((ecef - self._site) @ self._enu.T, -1, 0)
+        alt = np.degrees(np.arctan2(up, np.hypot(east, north)))
+        az = np.arctan2(east, north) % (2 * math.pi)
+        alt[errors != 0] = -90.0
+        if not shadow:
+            return alt, az, None
+
+        # cylindrical Earth shadow; the Sun barely moves within a window
+        middle = self._sky._ts.utc(
+            utc.year, utc.month, utc.day, utc.hour, utc.minute,
+            utc.second + float(offsets[len(offsets) // 2]),
+        )
+        planets = self._sky._planets
+        sun = planets["earth"].at(middle).observe(planets["sun"]).position.km
+        sun = sun / np.linalg.norm(sun)
+        along = teme @ sun
+        across = np.linalg.norm(teme - along[..., None] * sun, axis=-1)
+        sunlit = (along > 0) | (across > EARTH_RADIUS_KM)
+        return alt, az, sunlit
+
+    def positions(self, aware_when):
+        """Return chart azi, alt and labels of satellites above the horizon."""
+        if self._array is None:
+            return np.empty(0), np.empty(0), []
+        alt, az, _sunlit = self._altaz(aware_when, np.zeros(1))
+        up = alt[:, 0] > 0
+        labels = [label for label, visible in zip(self._labels, up) if visible]
+        return az[up, 0], 90 - alt[up, 0], labels
+
+    def pass_arcs(self, aware_when):
+        """
+        Return the remaining pass arcs as a list of (N, 2) chart arrays.
+
+        Arcs are sampled every ``PASS_STEP`` from the start of the
+        current window to the end of the next one, cached per window and
+        trimmed to ``aware_when`` on every call.
+        """
+        if self._array is None:
+            return []
+        window = self.window(aware_when)
+        if self._arcs is None or self._arcs[0] != window:
+            self.load()
+            self._arcs = (window, self._compute_arcs(window))
+        now = aware_when.timestamp()
+        arcs = []
+        for times, coords in self._arcs[1]:
+            keep = times >= now
+            if keep.sum() >= 2:
+                arcs.append(coords[keep])
+        return arcs
+
+    def _compute_arcs(self, window):
+        start = datetime.datetime.fromtimestamp(
+            window * PASS_WINDOW.total_seconds(), tz=datetime.timezone.utc
+        )
+        step = PASS_STEP.total_seconds()
+        offsets = np.arange(0, 2 * PASS_WINDOW.total_seconds() + step, step)
+        alt, az, sunlit = self._altaz(start, offsets, shadow=True)
+        visible = (alt > 0) & sunlit
+        times = start.timestamp() + offsets
+
+        arcs = []
+        for index in np.flatnonzero(visible.any(axis=1)):
+            # split each satellite's visible samples into contiguous runs
+            flags = np.concatenate(([False], visible[index], [False]))
+            edges = np.flatnonzero(np.diff(flags.astype(np.int8)))
+            for begin, end in zip(edges[::2], edges[1::2]):
+                if end - begin < 2:
+                    continue
+                coords = np.column_stack(
+                    (np.unwrap(az[index, begin:end]), 90 - alt[index, begin:end])
+                )
+                arcs.append((times[begin:end], coords))
+        _LOGGER.debug("Computed %d satellite pass arcs", len(arcs))
+        return arcs
+
+    def draw(self, ax, positions, arcs, style):
+        azi, alt, labels = positions
+        color = style.get("satellite_color", "#f5f5f5")
+        if arcs:
+            ax.add_collection(
+                LineCollection(
+                    arcs,
+                    colors=style.get("satellite_path_color", color),
+                    linewidths=0.8,
+                    alpha=style.get("satellite_path_alpha", 0.5),
+                    linestyles=":",
+                    zorder=1.5,
+                )
+            )
+        if not len(azi):
+            return
+        ax.scatter(
+            azi,
+            alt,
+            s=style.get("satellite_size", 12),
+            marker="D",
+            color=color,
+            linewidths=0,
+            zorder=2.5,
+        )
+        if len(labels) <= LABEL_LIMIT:
+            for label, x, y in zip(labels, azi, alt):
+                ax.annotate(
+                    label,
+                    (x, y),
+                    xytext=(4, 4),
+                    textcoords="offset points",
+                    fontsize=6,
+                    color=color,
+                )
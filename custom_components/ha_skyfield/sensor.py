@@ -1,18 +1,32 @@
 """HASS component for skyfield."""
+import io
 import logging
-from datetime import timedelta
+from datetime import datetime, timedelta
 import os
 
 from homeassistant.helpers.entity import Entity
 from homeassistant.util import Throttle
 from homeassistant.const import CONF_LATITUDE, CONF_LONGITUDE
 
+from .conjunctions import (
+    CONF_CONJUNCTION_DAYS,
+    CONF_CONJUNCTION_MAX_SEPARATION,
+    DEFAULT_MAX_SEPARATION,
+)
+from .export import CONF_EXPORT_ARCHIVE_DIR, CONF_EXPORT_RETAIN, FrameExporter
+from .observers import DATA_KEY, ObserverGroup
+from .services import register_services
+
 _LOGGER = logging.getLogger(__name__)
 
 DOMAIN = "skyfield"
 
 ICON = "mdi:sun"
+CONJUNCTION_ICON = "mdi:vector-link"
 MIN_TIME_BETWEEN_UPDATES = timedelta(minutes=1)
+MIN_TIME_BETWEEN_CONJUNCTION_UPDATES = timedelta(minutes=30)
+# upcoming events listed in the conjunction sensor's attributes
+CONJUNCTION_ATTRIBUTE_LIMIT = 10
 
 
 def setup_platform(hass, config, add_entities, discovery_info=None):
@@ -23,23 +37,68 @@ def setup_platform(hass, config, add_entities, discovery_info=None):
     configdir = hass.config.config_dir
     tmpdir = "/tmp/skyfield"
     _LOGGER.info("Setting up skyfield.")
-    panel = SkyField(latitude, longitude, tzname, configdir, tmpdir)
+    register_services(hass, tmpdir)
+    observer_group = hass.data.setdefault(DOMAIN, {}).setdefault(
+        DATA_KEY, ObserverGroup()
+    )
+    archive_dir = config.get(CONF_EXPORT_ARCHIVE_DIR)
+    panel = SkyField(
+        latitude,
+        longitude,
+        tzname,
+        configdir,
+        tmpdir,
+        observer_group,
+        export_retain=config.get(CONF_EXPORT_RETAIN, 0),
+        export_archive_dir=hass.config.path(archive_dir) if archive_dir else None,
+    )
+
+    entities = [panel]
+    if config.get(CONF_CONJUNCTION_DAYS):
+        entities.append(
+            SkyFieldConjunction(
+                latitude,
+                longitude,
+                tzname,
+                tmpdir,
+                observer_group,
+                config[CONF_CONJUNCTION_DAYS],
+                config.get(CONF_CONJUNCTION_MAX_SEPARATION, DEFAULT_MAX_SEPARATION),
+            )
+        )
 
     _LOGGER.info("Adding sunpanel entity")
-    add_entities([panel], True)
+    add_entities(entities, True)
     _LOGGER.info("Sunpanel init done")
 
 
 class SkyField(Entity):
     """A hass-specific entity."""
 
-    def __init__(self, latitude, longitude, tzname, configdir, tmpdir):
+    def __init__(
+        self,
+        latitude,
+        longitude,
+        tzname,
+        configdir,
+        tmpdir,
+        observer_group=None,
+        export_retain=0,
+        export_archive_dir=None,
+    ):
         from . import bodies
 
-        self.sky = bodies.Sky((latitude, longitude), tzname)
+        self.sky = bodies.Sky(
+            (latitude, longitude), tzname, observer_group=observer_group
+        )
         self._loaded = False
         self._configdir = configdir
         self._tmpdir = tmpdir
+        self._exporter = FrameExporter(
+            os.path.join(configdir, "www", f"sun.{self.sky.get_image_type}"),
+            retain=export_retain,
+            archive_dir=export_archive_dir,
+        )
 
     @property
     def name(self):
@@ -67,4 +126,62 @@ class SkyField(Entity):
             self.sky.load(self._tmpdir)
             self._loaded = True
         _LOGGER.debug("Updating skyfield plot")
-        self.sky.plot_sky(os.path.join(self._configdir, "www", f"sun.{self.sky.get_image_type}"))
+        when = datetime.now()
+        buf = io.BytesIO()
+        self.sky.plot_sky(buf, when=when)
+        # update() runs in the executor, off the event loop
+        self._exporter.write(buf.getvalue(), when)
+
+
+class SkyFieldConjunction(Entity):
+    """The next close approach between two charted bodies."""
+
+    def __init__(
+        self, latitude, longitude, tzname, tmpdir, observer_group, days, max_separation
+    ):
+        from . import bodies
+
+        self.sky = bodies.Sky(
+            (latitude, longitude),
+            tzname,
+            show_constellations=False,
+            observer_group=observer_group,
+            conjunction_days=days,
+            conjunction_max_separation=max_separation,
+        )
+        self._loaded = False
+        self._tmpdir = tmpdir
+        self._events = []
+
+    @property
+    def name(self):
+        return "Skyfield next conjunction"
+
+    @property
+    def icon(self):
+        return CONJUNCTION_ICON
+
+    @property
+    def state(self):
+        if not self._events:
+            return None
+        return self._events[0].name
+
+    @property
+    def extra_state_attributes(self):
+        attributes = {
+            "upcoming": [
+                event.as_dict() for event in self._events[:CONJUNCTION_ATTRIBUTE_LIMIT]
+            ]
+        }
+        if self._events:
+            attributes.update(self._events[0].as_dict())
+        return attributes
+
+    @Throttle(MIN_TIME_BETWEEN_CONJUNCTION_UPDATES)
+    def update(self):
+        """Update sensor data."""
+        if not self._loaded:
+            self.sky.load(self._tmpdir)
+            self._loaded = True
+        self._events = self.sky.conjunctions(datetime.now())
@@ -0,0 +1,371 @@
+# custom_components/ha_skyfield/server.py
+"""Headless render node, run through ``python -m ha_skyfield serve``."""
+
+import argparse
+import asyncio
+import collections
+import datetime
+import io
+import json
+import logging
+import threading
+import urllib.parse
+from http import HTTPStatus
+
+import pytz
+import yaml
+
+from .bodies import PRECISION_FAST, Sky
+from .encoding import CONTENT_TYPES
+from .observers import ObserverGroup
+from .render_queue import PRIORITY_PRERENDER, PRIORITY_WAITING, RenderQueue
+from . import streaming
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8765
+# "now" requests are rounded down to this many seconds so clients share frames
+DEFAULT_RESOLUTION = 60
+MAX_SKIES = 16
+MAX_FRAMES = 64
+MAX_REQUEST_LINE = 8192
+
+
+class BadRequest(ValueError):
+    """A query the server cannot answer, reported as HTTP 400."""
+
+
+def _close(sky, sky_lock):
+    with sky_lock:
+        sky.close()
+
+
+class RenderNode:
+    """
+    Skies, frames and the render pool shared by every client.
+
+    Skies are keyed by site, time zone and image type and share one
+    ephemeris and one observer group. Frames are cached by sky, theme
+    and instant. Both caches drop their least recently used entry.
+    """
+
+    def __init__(
+        self,
+        tmpdir,
+        workers=2,
+        resolution=DEFAULT_RESOLUTION,
+        presets=None,
+        sky_options=None,
+    ):
+        self._tmpdir = tmpdir
+        self._resolution = resolution
+        self._presets = presets or {}
+        self._sky_options = sky_options or {}
+        self._observers = ObserverGroup()
+        self._renderer = RenderQueue(workers)
+        self._lock = threading.Lock()
+        self._skies = collections.OrderedDict()
+        self._frames = collections.OrderedDict()
+        self._streams = {}
+
+    def _sky(self, latitude, longitude, tzname, image_type):
+        key = (round(latitude, 4), round(longitude, 4), tzname, image_type)
+        with self._lock:
+            if key in self._skies:
+                self._skies.move_to_end(key)
+                return self._skies[key]
+            sky = Sky(
+                (latitude, longitude),
+                tzname,
+                image_type=image_type,
+                presets=self._presets,
+                observer_group=self._observers,
+                **self._sky_options,
+            )
+            # a Sky draws on one thread at a time
+            entry = (sky, threading.Lock())
+            self._skies[key] = entry
+            if len(self._skies) > MAX_SKIES:
+                _key, evicted = self._skies.popitem(last=False)
+                # release its observer site once any render using it is done
+                self._renderer.submit(
+                    ("close", id(evicted[0])), lambda: _close(*evicted), PRIORITY_PRERENDER
+                )
+        return entry
+
+    def parse(self, query):
+        """Validate the query parameters shared by every endpoint."""
+        try:
+            latitude = float(query.get("lat", "nan"))
+            longitude = float(query.get("lon", "nan"))
+        except ValueError as err:
+            raise BadRequest("lat and lon must be numbers") from err
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise BadRequest("lat and lon are required and must be in range")
+
+        tzname = query.get("tz", "UTC")
+        try:
+            tz = pytz.timezone(tzname)
+        except pytz.UnknownTimeZoneError as err:
+            raise BadRequest(f"unknown time zone {tzname!r}") from err
+
+        when = query.get("time", "now")
+        if when == "now":
+            stamp = datetime.datetime.now(tz).timestamp()
+            stamp -= stamp % self._resolution
+            when = datetime.datetime.fromtimestamp(stamp, tz)
+        else:
+            try:
+                when = datetime.datetime.fromisoformat(when)
+            except ValueError as err:
+                raise BadRequest("time must be ISO 8601 or 'now'") from err
+            when = tz.localize(when) if when.tzinfo is None else when.astimezone(tz)
+        # Sky works in naive local time of its zone
+        return latitude, longitude, tzname, when.replace(tzinfo=None, microsecond=0)
+
+    async def frame(self, query):
+        """Return ``(content_type, image)`` for a frame query."""
+        latitude, longitude, tzname, when = self.parse(query)
+        image_type = query.get("format", "png")
+        if image_type not in CONTENT_TYPES:
+            raise BadRequest(f"unsupported format {image_type!r}")
+        theme = query.get("theme")
+        key = (round(latitude, 4), round(longitude, 4), tzname, image_type, theme, when)
+
+        with self._lock:
+            if key in self._frames:
+                self._frames.move_to_end(key)
+                return self._frames[key]
+
+        sky, sky_lock = self._sky(latitude, longitude, tzname, image_type)
+
+        def render():
+            output = io.BytesIO()
+            with sky_lock:
+                sky.load(self._tmpdir)
+                sky.plot_sky(output, when=when, theme=theme)
+                result = (sky.content_type, output.getvalue())
+            with self._lock:
+                self._frames[key] = result
+                if len(self._frames) > MAX_FRAMES:
+                    self._frames.popitem(last=False)
+            return result
+
+        return await asyncio.wrap_future(
+            self._renderer.submit(key, render, PRIORITY_WAITING)
+        )
+
+    async def positions(self, query):
+        """Return the JSON body for a positions query."""
+        latitude, longitude, tzname, when = self.parse(query)
+        sky, sky_lock = self._sky(latitude, longitude, tzname, "png")
+
+        def compute():
+            with sky_lock:
+                sky.load(self._tmpdir)
+                bodies = sky.body_positions(when)
+            return {
+                "latitude": latitude,
+                "longitude": longitude,
+                "time": when.isoformat(),
+                "timezone": tzname,
+                "bodies": bodies,
+            }
+
+        key = ("positions", round(latitude, 4), round(longitude, 4), tzname, when)
+        return await asyncio.wrap_future(
+            self._renderer.submit(key, compute, PRIORITY_WAITING)
+        )
+
+    def stream(self, query):
+        """
+        Return ``(key, broadcaster)`` for a live stream query.
+
+        Every viewer of the same place, theme and format shares one
+        broadcaster, which produces one frame per ``resolution``.
+        """
+        latitude, longitude, tzname, _when = self.parse(query)
+        image_type = query.get("format", "jpg")
+        if image_type not in CONTENT_TYPES:
+            raise BadRequest(f"unsupported format {image_type!r}")
+        theme = query.get("theme")
+        key = (round(latitude, 4), round(longitude, 4), tzname, image_type, theme)
+        broadcaster = self._streams.get(key)
+        if broadcaster is None:
+            live = dict(query, time="now", format=image_type)
+
+            async def produce():
+                _content_type, image = await self.frame(live)
+                return image
+
+            broadcaster = streaming.FrameBroadcaster(
+                produce, lambda: self._resolution, CONTENT_TYPES[image_type]
+            )
+            self._streams[key] = broadcaster
+        return key, broadcaster
+
+    def end_stream(self, key):
+        broadcaster = self._streams.get(key)
+        if broadcaster is not None and not broadcaster.viewers:
+            del self._streams[key]
+
+    def metrics(self):
+        with self._lock:
+            return dict(
+                self._renderer.metrics(),
+                skies=len(self._skies),
+                observer_sites=self._observers.site_count,
+                cached_frames=len(self._frames),
+                streams=len(self._streams),
+                stream_viewers=sum(b.viewers for b in self._streams.values()),
+                stream_frames=sum(b.renders for b in self._streams.values()),
+                stream_frames_skipped=sum(b.dropped for b in self._streams.values()),
+            )
+
+    def shutdown(self):
+        self._renderer.shutdown(wait=False)
+
+
+async def _handle(node, reader, writer):
+    try:
+        request_line = await reader.readline()
+        if len(request_line) > MAX_REQUEST_LINE:
+            await _respond(writer, 414, "text/plain", b"request line too long")
+            return
+        while (await reader.readline()).strip():
+            pass  # headers are not needed
+
+        try:
+            method, target, _version = request_line.decode("latin-1").split()
+        except ValueError:
+            await _respond(writer, 400, "text/plain", b"malformed request")
+            return
+        if method not in ("GET", "HEAD"):
+            await _respond(writer, 405, "text/plain", b"only GET is supported")
+            return
+
+        url = urllib.parse.urlsplit(target)
+        query = dict(urllib.parse.parse_qsl(url.query))
+        try:
+            if url.path == "/stream":
+                await _stream(node, reader, writer, query)
+                return
+            if url.path == "/frame":
+                content_type, body = await node.frame(query)
+            elif url.path == "/positions":
+                content_type = "application/json"
+                body = json.dumps(await node.positions(query)).encode()
+            elif url.path == "/metrics":
+                content_type = "application/json"
+                body = json.dumps(node.metrics()).encode()
+            else:
+                await _respond(writer, 404, "text/plain", b"not found")
+                return
+        except BadRequest as err:
+            await _respond(writer, 400, "text/plain", str(err).encode())
+            return
+        except Exception:  # noqa: BLE001 - report and keep serving
+            _LOGGER.exception("Failed to answer %s", target)
+            await _respond(writer, 500, "text/plain", b"render failed")
+            return
+        await _respond(writer, 200, content_type, body, head=method == "HEAD")
+    except (ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _stream(node, reader, writer, query):
+    key, broadcaster = node.stream(query)
+    writer.write(
+        (
+            "HTTP/1.1 200 OK\r\n"
+            f"Content-Type: {streaming.CONTENT_TYPE}\r\n"
+            "Cache-Control: no-cache\r\n"
+            "Connection: close\r\n\r\n"
+        ).encode("latin-1")
+    )
+
+    async def write(part):
+        writer.write(part)
+        await writer.drain()
+
+    try:
+        with broadcaster.subscribe() as subscription:
+            # stop as soon as the viewer hangs up, not at the next frame
+            sending = asyncio.ensure_future(streaming.pump(subscription, write))
+            hangup = asyncio.ensure_future(reader.read())
+            await asyncio.wait((sending, hangup), return_when=asyncio.FIRST_COMPLETED)
+            sending.cancel()
+            hangup.cancel()
+    finally:
+        node.end_stream(key)
+
+
+async def _respond(writer, status, content_type, body, head=False):
+    header = (
+        f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Cache-Control: no-cache\r\n"
+        "Connection: close\r\n\r\n"
+    )
+    writer.write(header.encode("latin-1"))
+    if not head:
+        writer.write(body)
+    await writer.drain()
+
+
+async def _serve(node, host, port):
+    server = await asyncio.start_server(
+        lambda reader, writer: _handle(node, reader, writer), host, port
+    )
+    _LOGGER.info("Serving sky charts on http://%s:%s", host, port)
+    print(f"Serving on http://{host}:{port}/frame?lat=47.6&lon=-122.3&tz=America/Los_Angeles")
+    async with server:
+        await server.serve_forever()
+
+
+def serve(argv=None):
+    """
+    Serve frames and positions over HTTP for any location.
+
+    ``/frame?lat=&lon=[&tz=][&time=][&theme=][&format=]`` returns an
+    image, ``/stream`` the same as a live MJPEG stream, ``/positions``
+    the same query as JSON alt/az and ``/metrics`` the render queue
+    and stream statistics.
+    """
+    parser = argparse.ArgumentParser(prog="ha_skyfield serve")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--resolution", type=int, default=DEFAULT_RESOLUTION,
+                        help="seconds 'now' is rounded to")
+    parser.add_argument("--presets", help="YAML file of color presets by theme name")
+    parser.add_argument("--show-stars", action="store_true")
+    parser.add_argument("--tmpdir", default=".")
+    args = parser.parse_args(argv)
+
+    presets = None
+    if args.presets:
+        with open(args.presets, encoding="utf-8") as stream:
+            presets = yaml.safe_load(stream)
+
+    logging.basicConfig(level=logging.INFO)
+    node = RenderNode(
+        args.tmpdir,
+        workers=args.workers,
+        resolution=max(1, args.resolution),
+        presets=presets,
+        sky_options={
+            "show_stars": args.show_stars,
+            "precision": PRECISION_FAST,
+            "redraw_threshold": 1.0,
+        },
+    )
+    try:
+        asyncio.run(_serve(node, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        node.shutdown()
@@ -0,0 +1,104 @@
+# custom_components/ha_skyfield/services.py
+"""The ``ha_skyfield.positions`` service: body positions over a time range."""
+
+import collections
+import logging
+import threading
+
+import pytz
+import voluptuous as vol
+import homeassistant.helpers.config_validation as cv
+from homeassistant.const import CONF_LATITUDE, CONF_LONGITUDE
+from homeassistant.core import SupportsResponse
+from homeassistant.exceptions import HomeAssistantError
+
+_LOGGER = logging.getLogger(__name__)
+
+DOMAIN = "skyfield"
+# services.yaml is looked up by the integration domain from manifest.json
+SERVICE_DOMAIN = "ha_skyfield"
+SERVICE_POSITIONS = "positions"
+DATA_KEY = "position_skies"
+# sites with a loaded Sky for the service, least recently used dropped
+MAX_SKIES = 8
+
+ATTR_BODIES = "bodies"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_STEP = "step"
+
+POSITIONS_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_BODIES): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+        vol.Optional(ATTR_STEP): cv.time_period,
+        vol.Inclusive(CONF_LATITUDE, "location"): cv.latitude,
+        vol.Inclusive(CONF_LONGITUDE, "location"): cv.longitude,
+    }
+)
+
+
+def register_services(hass, tmpdir):
+    """Register the services once, whichever platform is set up first."""
+    if hass.services.has_service(SERVICE_DOMAIN, SERVICE_POSITIONS):
+        return
+    skies = hass.data.setdefault(DOMAIN, {}).setdefault(
+        DATA_KEY, collections.OrderedDict()
+    )
+    skies_lock = threading.Lock()
+    tzname = str(hass.config.time_zone)
+    tz = pytz.timezone(tzname)
+
+    def sky_for(latitude, longitude):
+        from .bodies import Sky
+
+        key = (round(latitude, 4), round(longitude, 4))
+        with skies_lock:
+            if key in skies:
+                skies.move_to_end(key)
+                return skies[key]
+            # a Sky computes on one thread at a time
+            # only positions are needed, nothing chart specific
+            sky = Sky((latitude, longitude), tzname, show_constellations=False)
+            entry = (sky, threading.Lock())
+            skies[key] = entry
+            if len(skies) > MAX_SKIES:
+                skies.popitem(last=False)
+        return entry
+
+    def local(when):
+        # naive times are already local; Sky works in naive local time
+        if when is None or when.tzinfo is None:
+            return when
+        return when.astimezone(tz).replace(tzinfo=None)
+
+    def compute(data):
+        latitude = data.get(CONF_LATITUDE, hass.config.latitude)
+        longitude = data.get(CONF_LONGITUDE, hass.config.longitude)
+        sky, sky_lock = sky_for(latitude, longitude)
+        with sky_lock:
+            sky.load(tmpdir)
+            series = sky.position_series(
+                data.get(ATTR_BODIES),
+                local(data.get(ATTR_START)),
+                local(data.get(ATTR_END)),
+                data.get(ATTR_STEP),
+            )
+        return {"latitude": latitude, "longitude": longitude, **series}
+
+    async def positions(call):
+        """Return alt/az/distance series of the requested bodies."""
+        try:
+            return await hass.async_add_executor_job(compute, dict(call.data))
+        except ValueError as err:
+            raise HomeAssistantError(str(err)) from err
+
+    hass.services.register(
+        SERVICE_DOMAIN,
+        SERVICE_POSITIONS,
+        positions,
+        schema=POSITIONS_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    _LOGGER.debug("Registered %s.%s", SERVICE_DOMAIN, SERVICE_POSITIONS)
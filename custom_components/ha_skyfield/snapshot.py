@@ -0,0 +1,124 @@
+# custom_components/ha_skyfield/snapshot.py
+"""The last good frame of a camera, kept on disk across restarts."""
+
+import datetime
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from .export import write_atomic
+
+_LOGGER = logging.getLogger(__name__)
+
+# under the Home Assistant config directory
+SNAPSHOT_DIR = os.path.join(".storage", "skyfield")
+# frames are saved at most this often, to spare SD cards
+SAVE_INTERVAL = 600
+METADATA_VERSION = 2
+
+
+def snapshot_name(*identity):
+    """Return a stable file stem for a camera described by ``identity``."""
+    digest = hashlib.blake2b(repr(identity).encode(), digest_size=8).hexdigest()
+    return f"camera-{digest}"
+
+
+class FrameSnapshot:
+    """
+    Every rendition of one frame plus its metadata, in ``directory``.
+
+    Each save writes its renditions under new file names carrying a save
+    id, then atomically replaces the metadata file naming them, and only
+    then deletes the previous save's files. A crash at any point leaves
+    the metadata pointing at one complete save. ``load`` only returns
+    renditions whose content type still matches the camera's encoders,
+    so a changed ``image_type`` never serves the wrong format.
+
+    Both methods do blocking I/O; call them from an executor or a
+    render worker.
+    """
+
+    def __init__(self, directory, name, interval=SAVE_INTERVAL):
+        self._directory = directory
+        self._name = name
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._saved = None
+
+    @property
+    def _metadata_path(self):
+        return os.path.join(self._directory, f"{self._name}.json")
+
+    def _path(self, filename):
+        return os.path.join(self._directory, filename)
+
+    def load(self, content_types):
+        """Return ``(when, outputs)`` of the saved frame, or None."""
+        try:
+            with open(self._metadata_path, encoding="utf-8") as metadata_file:
+                metadata = json.load(metadata_file)
+            if metadata.get("version") != METADATA_VERSION:
+                return None
+            outputs = {}
+            for output, content_type in content_types.items():
+                if metadata["outputs"].get(output) != content_type:
+                    continue
+                with open(self._path(metadata["files"][output]), "rb") as image:
+                    outputs[output] = image.read()
+            when = datetime.datetime.fromisoformat(metadata["when"])
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as err:
+            _LOGGER.warning("Ignoring unreadable snapshot %s: %s", self._metadata_path, err)
+            return None
+        if not outputs:
+            return None
+        return when, outputs
+
+    def save(self, when, outputs, content_types):
+        """Save ``outputs`` unless a frame was saved under ``interval`` ago."""
+        with self._lock:
+            now = time.monotonic()
+            if self._saved is not None and now - self._saved < self._interval:
+                return False
+            save_id = uuid.uuid4().hex[:12]
+            files = {output: f"{self._name}.{save_id}.{output}" for output in outputs}
+            metadata = {
+                "version": METADATA_VERSION,
+                "when": when.isoformat(),
+                "outputs": {output: content_types[output] for output in outputs},
+                "files": files,
+            }
+            try:
+                for output, image in outputs.items():
+                    write_atomic(self._path(files[output]), image)
+                write_atomic(self._metadata_path, json.dumps(metadata).encode("utf-8"))
+            except OSError as err:
+                _LOGGER.error("Could not save snapshot to %s: %s", self._directory, err)
+                return False
+            self._saved = now
+            self._remove_other_saves(set(files.values()))
+            return True
+
+    def _remove_other_saves(self, keep):
+        """Delete renditions of earlier (or interrupted) saves."""
+        prefix = f"{self._name}."
+        try:
+            entries = os.listdir(self._directory)
+        except OSError:
+            return
+        for entry in entries:
+            if (
+                entry.startswith(prefix)
+                and entry not in keep
+                and entry != os.path.basename(self._metadata_path)
+                and not entry.endswith(".tmp")
+            ):
+                try:
+                    os.unlink(self._path(entry))
+                except OSError:
+                    pass
@@ -0,0 +1,38 @@
+# custom_components/ha_skyfield/spherical.py
+"""Small spherical geometry helpers for cheap horizon tests."""
+
+import numpy as np
+
+# covers precession since J2000 and refraction at the horizon
+HORIZON_MARGIN = 1.0
+
+
+def unit_vectors(ra_deg, dec_deg):
+    """Return (..., 3) unit vectors for RA/Dec in degrees."""
+    ra = np.radians(ra_deg)
+    dec = np.radians(dec_deg)
+    return np.stack(
+        [np.cos(dec) * np.cos(ra), np.cos(dec) * np.sin(ra), np.sin(dec)], axis=-1
+    )
+
+
+def bounding_cap(vectors):
+    """Return the center unit vector and radius (degrees) enclosing ``vectors``."""
+    center = vectors.sum(axis=0)
+    center /= np.linalg.norm(center)
+    return center, float(np.degrees(np.arccos(np.clip(vectors @ center, -1, 1))).max())
+
+
+def zenith_vector(zenith_ra_hours, zenith_dec_deg):
+    return unit_vectors(zenith_ra_hours * 15, zenith_dec_deg)
+
+
+def reaches_sky(centers, radii, zenith):
+    """
+    Return True where a cap reaches above the horizon.
+
+    A cap is wholly below the horizon when its center is further than
+    90 degrees plus its radius from the zenith.
+    """
+    distance = np.degrees(np.arccos(np.clip(centers @ zenith, -1, 1)))
+    return distance - radii < 90 + HORIZON_MARGIN
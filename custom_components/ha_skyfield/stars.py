@@ -0,0 +1,127 @@
+# custom_components/ha_skyfield/stars.py
+"""Background field of bright stars from a compact bundled catalog."""
+
+import functools
+import logging
+import os
+
+import numpy as np
+
+from . import spherical
+
+_LOGGER = logging.getLogger(__name__)
+
+THIS_DIR = os.path.split(__file__)[0]
+
+# Hipparcos (ESA 1997) stars with V <= 6.0, J2000 RA/Dec in degrees,
+# stored as a flat float32 record array sorted by sky cell.
+CATALOG_FILE = os.path.join(THIS_DIR, "bright_stars.npy")
+CATALOG_DTYPE = np.dtype([("ra", "<f4"), ("dec", "<f4"), ("mag", "<f4")])
+CATALOG_LIMIT = 6.0
+
+CELL_DEGREES = 15
+# relative marker area per magnitude step
+SIZE_RATIO = 0.7
+
+
+def cell_ids(ra_deg, dec_deg):
+    """Return the sky cell of each position (declination band, RA slice)."""
+    bands = 180 // CELL_DEGREES
+    slices = 360 // CELL_DEGREES
+    band = np.clip((np.asarray(dec_deg) + 90) // CELL_DEGREES, 0, bands - 1)
+    column = (np.asarray(ra_deg) % 360) // CELL_DEGREES
+    return (band * slices + column).astype(int)
+
+
+def write_catalog(ra_deg, dec_deg, mag, path=CATALOG_FILE, limit=CATALOG_LIMIT):
+    """Write a catalog file from J2000 RA/Dec (degrees) and V magnitudes."""
+    ra_deg, dec_deg, mag = (np.asarray(a, dtype=float) for a in (ra_deg, dec_deg, mag))
+    keep = mag <= limit
+    table = np.empty(int(keep.sum()), dtype=CATALOG_DTYPE)
+    table["ra"] = ra_deg[keep]
+    table["dec"] = dec_deg[keep]
+    table["mag"] = mag[keep]
+    order = np.lexsort((table["mag"], cell_ids(table["ra"], table["dec"])))
+    np.save(path, table[order])
+
+
+class StarCatalog:
+    """
+    Memory-mapped star table bucketed into sky cells.
+
+    Each cell keeps a bounding spherical cap (center and radius) of its
+    stars, so a cell that lies wholly below the horizon can be dropped
+    with one dot product before any star in it is projected.
+    """
+
+    def __init__(self, path=CATALOG_FILE):
+        self._table = np.load(path, mmap_mode="r")
+        ids = cell_ids(self._table["ra"], self._table["dec"])
+        _cells, self._starts = np.unique(ids, return_index=True)
+        self._stops = np.append(self._starts[1:], len(ids))
+
+        vectors = spherical.unit_vectors(self._table["ra"], self._table["dec"])
+        centers = np.add.reduceat(vectors, self._starts, axis=0)
+        centers /= np.linalg.norm(centers, axis=1)[:, None]
+        cosines = np.einsum("ij,ij->i", vectors, np.repeat(centers, self._stops - self._starts, axis=0))
+        radii = np.degrees(np.arccos(np.clip(cosines, -1, 1)))
+        self._centers = centers
+        self._radii = np.maximum.reduceat(radii, self._starts)
+
+    def __len__(self):
+        return len(self._table)
+
+    def above_horizon(self, zenith, mag_limit):
+        """Return RA (hours), Dec and magnitude of stars in cells reaching the sky."""
+        reaching = spherical.reaches_sky(self._centers, self._radii, zenith)
+        rows = np.concatenate(
+            [
+                np.arange(start, stop)
+                for start, stop in zip(self._starts[reaching], self._stops[reaching])
+            ]
+            or [np.empty(0, dtype=int)]
+        )
+        stars = self._table[rows]
+        stars = stars[stars["mag"] <= mag_limit]
+        return (
+            stars["ra"].astype(float) / 15,
+            stars["dec"].astype(float),
+            stars["mag"].astype(float),
+        )
+
+
+@functools.lru_cache(maxsize=1)
+def load_catalog():
+    """Return the bundled catalog, mapping it on first use."""
+    return StarCatalog()
+
+
+class StarField:
+    """Catalog stars brighter than a magnitude limit, drawn as one scatter."""
+
+    def __init__(self, sky, mag_limit=5.5):
+        self._sky = sky
+        self._mag_limit = mag_limit
+
+    def positions(self, when, zenith):
+        """Return chart azi, alt and magnitude of stars above the horizon."""
+        ra, dec, mag = load_catalog().above_horizon(zenith, self._mag_limit)
+        if not len(ra):
+            return np.empty(0), np.empty(0), np.empty(0)
+        azi, alt = self._sky.compute_star_positions(ra, dec, when)
+        up = alt <= 90
+        return azi[up], alt[up], mag[up]
+
+    def draw(self, ax, positions, style):
+        azi, alt, mag = positions
+        if not len(azi):
+            return
+        ax.scatter(
+            azi,
+            alt,
+            s=style.get("star_field_size", 20) * SIZE_RATIO ** mag,
+            alpha=style.get("star_alpha", 0.6),
+            color=style.get("star_color", "#64CDFA"),
+            linewidths=0,
+            zorder=0.5,
+        )
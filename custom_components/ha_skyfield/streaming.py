@@ -0,0 +1,123 @@
+# custom_components/ha_skyfield/streaming.py
+"""One frame producer fanned out to any number of MJPEG viewers."""
+
+import asyncio
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+BOUNDARY = "skyfieldframe"
+CONTENT_TYPE = f"multipart/x-mixed-replace;boundary={BOUNDARY}"
+# a viewer that cannot take one frame in this many seconds is dropped
+STALL_TIMEOUT = 30.0
+
+
+def multipart(image, content_type):
+    """Wrap an encoded image as one part of the MJPEG stream."""
+    return (
+        f"--{BOUNDARY}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(image)}\r\n\r\n"
+    ).encode("ascii") + image + b"\r\n"
+
+
+class FrameBroadcaster:
+    """
+    Render once per interval for every connected viewer.
+
+    A producer task runs while at least one viewer is subscribed. Each
+    frame is wrapped as a multipart part once and the same bytes are
+    offered to every subscription. Subscriptions hold at most one
+    pending frame: a viewer that falls behind skips to the newest frame
+    instead of queueing old ones, so a slow screen never holds up the
+    producer or the other viewers.
+    """
+
+    def __init__(self, produce, interval, content_type):
+        self._produce = produce
+        self._interval = interval
+        self._content_type = content_type
+        self._subscriptions = set()
+        self._task = None
+        self._latest = None
+        self.renders = 0
+        self.dropped = 0
+
+    @property
+    def viewers(self):
+        return len(self._subscriptions)
+
+    def subscribe(self):
+        """Return a new subscription, starting the producer if needed."""
+        subscription = Subscription(self)
+        self._subscriptions.add(subscription)
+        if self._latest is not None:
+            subscription.offer(self._latest)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        self._subscriptions.discard(subscription)
+        if not self._subscriptions and self._task is not None:
+            self._task.cancel()
+            self._task = None
+            # a viewer arriving later should not get a stale frame first
+            self._latest = None
+
+    async def _run(self):
+        while self._subscriptions:
+            try:
+                image = await self._produce()
+            except asyncio.CancelledError:
+                raise
+            except Exception:  # noqa: BLE001 - keep the stream alive
+                _LOGGER.exception("Failed to produce a stream frame")
+            else:
+                self.renders += 1
+                self._latest = multipart(image, self._content_type)
+                for subscription in list(self._subscriptions):
+                    subscription.offer(self._latest)
+            await asyncio.sleep(self._interval())
+
+
+class Subscription:
+    """One viewer's view of a broadcaster; iterate it for multipart frames."""
+
+    def __init__(self, broadcaster):
+        self._broadcaster = broadcaster
+        self._queue = asyncio.Queue(maxsize=1)
+
+    def offer(self, part):
+        if self._queue.full():
+            self._queue.get_nowait()
+            self._broadcaster.dropped += 1
+        self._queue.put_nowait(part)
+
+    def close(self):
+        self._broadcaster._unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self._queue.get()
+
+
+async def pump(subscription, write):
+    """
+    Send frames from ``subscription`` through the async ``write``.
+
+    Returns when the viewer goes away or stalls for STALL_TIMEOUT.
+    """
+    try:
+        async for part in subscription:
+            await asyncio.wait_for(write(part), STALL_TIMEOUT)
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
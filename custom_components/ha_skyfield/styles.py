@@ -0,0 +1,89 @@
+# custom_components/ha_skyfield/styles.py
+"""Color presets compiled into immutable, fully resolved styles."""
+
+import copy
+from collections.abc import Mapping
+from types import MappingProxyType
+
+DEFAULT_THEME = "dark"
+
+# built-in dark palette, the fallback for every key a preset leaves out
+BUILTIN_DARK = {
+    "glow": True,
+    "background_outer": "#020202",
+    "background_inner": "#1c1c1c",
+    "grid_circle": "#050505",
+    "text": "#f0f0f0",
+    "legend_face": "#2a2a2a",
+    "legend_edge": "#444444",
+    "rgrid_color": "#707070",
+    "tgrid_color": "#707070",
+    "sun_today": "#fff09a",
+    "solstice_winter": "#56b4e9",
+    "solstice_summer": "#009e73",
+    "analemma": "#fff09a",
+    "star_size": 10,
+    "star_color": "#64CDFA",
+    "star_alpha": 0.6,
+    "star_field_size": 20,
+    "constellation_color": "#64CDFA",
+    "constellation_linewidth": 0.5,
+    "constellation_alpha": 0.1,
+    "trail_linewidth": 1.0,
+    "satellite_color": "#f5f5f5",
+    "satellite_size": 12,
+    "satellite_path_color": "#f5f5f5",
+    "satellite_path_alpha": 0.5,
+    "conjunction_color": "#f0f0f0",
+    "planets": {
+        "Sun": "#fff09a",
+        "Mercury": "#adbbc3",
+        "Venus": "#e5dbb6",
+        "Moon": "#999999",
+        "Mars": "#ef000f",
+        "Jupiter": "#e6b200",
+        "Saturn": "#ffb000",
+        "Uranus": "#00f9ff",
+        "Neptune": "#0079ff",
+    },
+}
+
+
+class Style(Mapping):
+    """A read-only color preset with every key resolved."""
+
+    def __init__(self, name, values):
+        self.name = name
+        self._values = values
+
+    def __getitem__(self, key):
+        return self._values[key]
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def planet_color(self, name):
+        return self._values["planets"].get(name)
+
+
+def compile_style(name, preset=None):
+    """Resolve ``preset`` over the built-in dark palette without touching it."""
+    values = copy.deepcopy(BUILTIN_DARK)
+    for key, value in (preset or {}).items():
+        if key == "planets":
+            values["planets"].update(value or {})
+        else:
+            values[key] = copy.deepcopy(value)
+    values["glow"] = bool(values["glow"])
+    values["planets"] = MappingProxyType(values["planets"])
+    return Style(name, values)
+
+
+def compile_styles(presets=None):
+    """Compile every preset, always including the built-in dark one."""
+    presets = dict(presets or {})
+    presets.setdefault(DEFAULT_THEME, {})
+    return {name: compile_style(name, preset) for name, preset in presets.items()}
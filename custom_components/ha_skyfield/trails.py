@@ -0,0 +1,101 @@
+# custom_components/ha_skyfield/trails.py
+"""Past and upcoming tracks of the charted bodies."""
+
+import datetime
+import math
+
+import numpy as np
+from matplotlib.collections import LineCollection
+from matplotlib.colors import to_rgba
+
+# trail samples lie on a fixed grid so consecutive frames share them
+TRAIL_STEP = datetime.timedelta(minutes=5)
+GRID_EPOCH = datetime.datetime(2000, 1, 1)
+
+
+def grid_index(when):
+    """Return the index of the last grid step at or before ``when``."""
+    return math.floor((when - GRID_EPOCH) / TRAIL_STEP)
+
+
+def grid_time(index):
+    return GRID_EPOCH + index * TRAIL_STEP
+
+
+class TrailSet:
+    """
+    Alt/az samples of every body over the last and next ``hours``.
+
+    Samples are kept in a ring buffer indexed by grid step. Each update
+    only computes the steps that entered the window since the previous
+    frame, in one batched time array per body, and forgets the ones
+    that left it, so the cost follows elapsed time rather than trail
+    length.
+    """
+
+    def __init__(self, points, hours):
+        self._points = points
+        self._span = max(1, round(datetime.timedelta(hours=hours) / TRAIL_STEP))
+        capacity = 2 * self._span + 1
+        self._azi = np.empty((len(points), capacity))
+        self._alt = np.empty((len(points), capacity))
+        # grid index of the oldest sample, its slot in the ring and the count
+        self._first = None
+        self._head = 0
+        self._count = 0
+
+    @property
+    def capacity(self):
+        return self._azi.shape[1]
+
+    def update(self, when):
+        """Advance the window to ``when`` and return ``(first, azi, alt)``."""
+        now = grid_index(when)
+        first, last = now - self._span, now + self._span
+
+        if self._first is None or not self._first <= first <= self._first + self._count:
+            # first frame, a jump back in time or a gap longer than the window
+            self._first, self._head, self._count = first, 0, 0
+        else:
+            expired = first - self._first
+            self._first = first
+            self._head = (self._head + expired) % self.capacity
+            self._count -= expired
+
+        fresh = np.arange(self._first + self._count, last + 1)
+        if len(fresh):
+            whens = [grid_time(int(index)) for index in fresh]
+            slots = (self._head + self._count + np.arange(len(fresh))) % self.capacity
+            for row, point in enumerate(self._points):
+                self._azi[row, slots], self._alt[row, slots] = point.positions(whens)
+            self._count += len(fresh)
+
+        order = (self._head + np.arange(self._count)) % self.capacity
+        return self._first, self._azi[:, order], self._alt[:, order]
+
+    def draw(self, ax, trails, when, style):
+        """Draw every trail as one LineCollection, the past brighter."""
+        first, azi, alt = trails
+        now = grid_index(when) - first
+        segments = []
+        colors = []
+        for row, point in enumerate(self._points):
+            color = style.planet_color(point._label)
+            start = np.column_stack((azi[row, :-1], alt[row, :-1]))
+            end = np.column_stack((azi[row, 1:], alt[row, 1:]))
+            # keep the segment on the short side of the azimuth wrap
+            end[:, 0] = start[:, 0] + (end[:, 0] - start[:, 0] + math.pi) % (2 * math.pi) - math.pi
+            up = (start[:, 1] <= 90) & (end[:, 1] <= 90)
+            past = np.arange(len(start)) < now
+            for keep, alpha in ((up & past, 0.6), (up & ~past, 0.25)):
+                segments.extend(np.stack((start[keep], end[keep]), axis=1))
+                colors.extend([to_rgba(color, alpha)] * int(keep.sum()))
+        if segments:
+            ax.add_collection(
+                LineCollection(
+                    segments,
+                    colors=colors,
+                    linewidths=style.get("trail_linewidth", 1.0),
+                    zorder=0.8,
+                )
+            )